@@ -0,0 +1,50 @@
+"""Сравнение производительности StrongParser (рекурсивный разбор) и QueryParser (однопроходный разбор).
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.parse_qs
+
+"""
+import sys
+import timeit
+
+from snatch.search.parse_qs import StrongParser
+from snatch.search.query_parser import QueryParser
+
+SIZES = (1, 10, 100, 1000, 10000)
+
+
+def flat_query(size: int) -> str:
+    """Запрос из size условий внутри одной группы and"""
+    return "and({})".format(",".join(f"name.eq.{i}" for i in range(size)))
+
+
+def grouped_query(size: int) -> str:
+    """Запрос из size условий, каждое из которых обернуто в собственную группу"""
+    return ",".join(f"and(id.neq.{i},name.like.A{i}*)" for i in range(size))
+
+
+def measure(parser, query: str, number: int) -> str:
+    try:
+        seconds = timeit.timeit(lambda: parser(query), number=number) / number
+    except RecursionError:
+        return "RecursionError"
+    return f"{seconds * 1000:.3f} ms"
+
+
+def main():
+    strong = lambda query: StrongParser()(query, None)
+    single_pass = lambda query: QueryParser()(query)
+    print(f"{'shape':<8} {'terms':>6} {'StrongParser':>16} {'QueryParser':>16}")
+    for name, builder in (("flat", flat_query), ("grouped", grouped_query)):
+        for size in SIZES:
+            query = builder(size)
+            number = max(1, 1000 // size)
+            print(
+                f"{name:<8} {size:>6} {measure(strong, query, number):>16} "
+                f"{measure(single_pass, query, number):>16}"
+            )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
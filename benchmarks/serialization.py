@@ -0,0 +1,149 @@
+"""Сравнение сериализации сериализаторами примера manager с планом полей и прежним циклом по полям.
+
+Объекты создаются в памяти, списки дочерних объектов передаются через кэш prefetch_related, поэтому
+запросов к БД нет и измеряется только сериализация.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.serialization
+
+"""
+import os
+import sys
+import timeit
+from collections import OrderedDict
+
+import django
+from django.conf import settings
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "example"))
+settings.configure(
+    INSTALLED_APPS=["django.contrib.contenttypes", "django.contrib.auth", "rest_framework", "manager", "snatch"],
+    DATABASES={"default": {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"}},
+    ROOT_URLCONF="manager.urls",
+    SNATCH_FRAMEWORK={},
+)
+django.setup()
+
+from rest_framework.fields import SkipField  # noqa: E402
+from rest_framework.relations import PKOnlyObject  # noqa: E402
+
+from manager import models, serializer  # noqa: E402
+from snatch import wrappers  # noqa: E402
+from snatch.mixins import SnatchSerializationMixin  # noqa: E402
+from snatch.utils import get_link_many, get_link_one, get_route_url  # noqa: E402
+
+ROWS = 200
+CHILDREN = 5
+MAX_LEVEL = 2
+
+
+def legacy_get_link_one(serializer, instance):
+    """Прежнее получение ссылки на объект (путь эндпойнта для каждой строки)"""
+    return f"{get_route_url(serializer.Meta.model, 'detail')}?query={instance._meta.pk.name}.eq.{instance.pk}"
+
+
+def legacy_get_link_many(field, instance, owner=None):
+    """Прежнее получение ссылки на список объектов (путь эндпойнта для каждой строки)"""
+    return get_link_many(field, instance)
+
+
+@wrappers.add_link_one
+def legacy_to_representation(self, instance):
+    """Прежний цикл по полям сериализатора"""
+    ret = OrderedDict()
+    fields = self._readable_fields
+    fields_tree = self.context.get("fields")
+    model = instance._meta.model
+    for field in fields:
+        if fields_tree and field.field_name not in fields_tree:
+            continue
+        try:
+            attribute = field.get_attribute(instance)
+        except SkipField:
+            continue
+        check_for_none = attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+        if check_for_none is None:
+            model_field = model._meta.get_field(field.source)
+            ret[field.field_name] = {"link": None, "self": None} if model_field.is_relation else None
+        elif fields_tree is None:
+            ret[field.field_name] = field.to_representation(attribute)
+        else:
+            self.context["fields"] = fields_tree.get(field.field_name) or None
+            try:
+                ret[field.field_name] = field.to_representation(attribute)
+            finally:
+                self.context["fields"] = fields_tree
+    return ret
+
+
+def prefetched(instance, name: str, objects: list):
+    """Заполнение кэша prefetch_related списком дочерних объектов"""
+    queryset = getattr(instance, name).all()
+    queryset._result_cache = objects
+    queryset._prefetch_done = True
+    instance._prefetched_objects_cache = {name: queryset}
+
+
+def build():
+    """Создание объектов для сериализации"""
+    status = models.TaskStatusModel(name="Выполнена", system_name="done")
+    tasks, actions, logs = list(), list(), list()
+    for index in range(ROWS):
+        task = models.TaskModel(name=f"Task {index}")
+        base_task = models.BaseTaskModel(name=f"Base task {index}")
+        parent = models.ActionModel(task=task, name=f"Action {index}")
+        children = [parent] + [
+            models.ActionModel(task=task, parent=parent, name=f"Action {index}.{number}", number=number)
+            for number in range(CHILDREN)
+        ]
+        sequences = [models.TaskSequenceModel(base_task=base_task, task=task, number=1)]
+        prefetched(task, "action_list", children)
+        prefetched(base_task, "task_sequence_list", sequences)
+        tasks.append(task)
+        actions.extend(children)
+        logs.append(models.BaseTaskLogModel(base_task=base_task, status=status))
+    return (
+        ("TaskStatusSerializer", serializer.TaskStatusSerializer, [status] * ROWS),
+        ("TaskSerializer", serializer.TaskSerializer, tasks),
+        ("ActionSerializer", serializer.ActionSerializer, actions[:ROWS]),
+        ("BaseTaskLogSerializer", serializer.BaseTaskLogSerializer, logs),
+    )
+
+
+def serialize(serializer_class, objects):
+    return serializer_class(objects, many=True, context={"max_level": MAX_LEVEL}).data
+
+
+def measure(serializer_class, objects, number: int) -> float:
+    return min(timeit.repeat(lambda: serialize(serializer_class, objects), number=number, repeat=5)) / number
+
+
+def use_legacy(legacy: bool):
+    """Переключение между прежним циклом по полям и планом сериализации"""
+    SnatchSerializationMixin.to_representation = legacy_to_representation if legacy else plan_to_representation
+    wrappers.get_link_one = legacy_get_link_one if legacy else get_link_one
+    wrappers.get_link_many = legacy_get_link_many if legacy else get_link_many
+
+
+plan_to_representation = SnatchSerializationMixin.to_representation
+
+
+def main():
+    print(f"{'serializer':<22} {'rows':>6} {'legacy':>12} {'plan':>12} {'speedup':>8}")
+    for name, serializer_class, objects in build():
+        use_legacy(True)
+        legacy_data = serialize(serializer_class, objects)
+        legacy = measure(serializer_class, objects, 5)
+        use_legacy(False)
+        plan_data = serialize(serializer_class, objects)
+        plan = measure(serializer_class, objects, 5)
+        assert legacy_data == plan_data, name
+        print(
+            f"{name:<22} {len(objects):>6} {legacy * 1000:>9.2f} ms {plan * 1000:>9.2f} ms "
+            f"{legacy / plan:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
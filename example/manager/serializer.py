@@ -19,7 +19,9 @@ class TaskStatusSerializer(SnatchSerializer):
 
 
 class BaseTaskSerializer(SnatchSerializer):
-    task_sequence_list = SnatchSerializerMethodField()
+    task_sequence_list = SnatchSerializerMethodField(
+        serializer_class="TaskSequenceSerializer"
+    )
 
     def get_task_sequence_list(self, instance):
         context = copy.copy(self.context)
@@ -41,7 +43,7 @@ class BaseTaskLogSerializer(SnatchSerializer):
 
 
 class TaskSerializer(SnatchSerializer):
-    action_list = SnatchSerializerMethodField()
+    action_list = SnatchSerializerMethodField(serializer_class="ActionSerializer")
 
     def get_action_list(self, instance):
         context = copy.copy(self.context)
@@ -0,0 +1,159 @@
+import typing as t
+from collections import OrderedDict, namedtuple
+
+from django.db.models import Avg, Count, Max, Min, Model, QuerySet, Sum
+
+from snatch.exceptions import AggregateError
+from snatch.search.validators import validate_attributes
+
+AggregateColumn = namedtuple("AggregateColumn", ["name", "lookup", "expression"])
+
+
+class Aggregation:
+    """Агрегация записей модели одним запросом values(группировка).annotate(агрегаты).
+
+    Группировка задается списком путей атрибутов через запятую (status.name,base_task), агрегаты - списком
+    выражений функция.путь (count, count.parent, count_distinct.task, sum.number, avg.number, min.date,
+    max.date). Сортировка задается по именам группировок и агрегатов с направлением asc/desc
+    (count.desc, status.name.asc); без сортировки строки упорядочиваются по группировкам. Без группировки
+    возвращается одна строка агрегатов по всем записям. Функции sum и avg применяются только к числовым полям
+    и интервалам (numeric_types).
+
+    """
+
+    functions = {
+        "count": lambda lookup: Count(lookup),
+        "count_distinct": lambda lookup: Count(lookup, distinct=True),
+        "sum": Sum,
+        "avg": Avg,
+        "min": Min,
+        "max": Max,
+    }
+    numeric_functions = ("sum", "avg")
+    numeric_types = (
+        "IntegerField",
+        "BigIntegerField",
+        "SmallIntegerField",
+        "PositiveIntegerField",
+        "PositiveBigIntegerField",
+        "PositiveSmallIntegerField",
+        "FloatField",
+        "DecimalField",
+        "DurationField",
+    )
+
+    def __init__(
+        self,
+        model: type(Model),
+        group: t.Optional[str] = None,
+        aggregate: t.Optional[str] = None,
+        order: t.Optional[str] = None,
+    ):
+        self.model = model
+        self.group = [self._get_group(name) for name in self._split(group)]
+        self.aggregates = [
+            self._get_aggregate(name, index)
+            for index, name in enumerate(self._split(aggregate) or ["count"])
+        ]
+        self.order = self._get_order(order)
+
+    def __call__(self, queryset: QuerySet, offset: int = 0, limit: t.Optional[int] = None) -> t.List[OrderedDict]:
+        """Получение агрегированных строк
+
+        Args:
+            queryset: отфильтрованное множество записей
+            offset: сдвиг от начала списка строк
+            limit: количество строк
+
+        Returns:
+            список строк {группировка: значение, агрегат: значение}
+        """
+        annotations = {column.lookup: column.expression for column in self.aggregates}
+        if not self.group:
+            row = queryset.order_by().aggregate(**annotations)
+            return [OrderedDict((column.name, row[column.lookup]) for column in self.aggregates)]
+
+        rows = (
+            queryset.order_by()
+            .values(*[column.lookup for column in self.group])
+            .annotate(**annotations)
+            .order_by(*self.order)
+        )
+        if limit is not None:
+            rows = rows[offset : offset + limit]
+        columns = self.group + self.aggregates
+        return [OrderedDict((column.name, row[column.lookup]) for column in columns) for row in rows]
+
+    @property
+    def lookups(self) -> t.List[str]:
+        """Пути атрибутов группировок и агрегатов в нотации Django
+
+        Returns:
+            список путей
+        """
+        lookups = [column.lookup for column in self.group]
+        lookups.extend(
+            column.expression.source_expressions[0].name
+            for column in self.aggregates
+            if hasattr(column.expression.source_expressions[0], "name")
+        )
+        return lookups
+
+    def _get_group(self, name: str) -> AggregateColumn:
+        """Разбор пути группировки
+
+        Args:
+            name: путь атрибутов через точку
+
+        Returns:
+            колонка группировки
+        """
+        attributes = name.split(".")
+        validate_attributes(attributes, self.model)
+        return AggregateColumn(name, "__".join(attributes), None)
+
+    def _get_aggregate(self, name: str, index: int) -> AggregateColumn:
+        """Разбор выражения агрегата
+
+        Args:
+            name: выражение функция.путь
+            index: номер агрегата
+
+        Returns:
+            колонка агрегата
+        """
+        function, _, path = name.partition(".")
+        if function not in self.functions or (not path and function != "count"):
+            raise AggregateError(name)
+        lookup = "pk"
+        if path:
+            attributes = path.split(".")
+            info = validate_attributes(attributes, self.model)
+            if function in self.numeric_functions and (
+                info.is_relation or info.field.get_internal_type() not in self.numeric_types
+            ):
+                raise AggregateError(name)
+            lookup = "__".join(attributes)
+        return AggregateColumn(name, f"snatch_aggregate_{index}", self.functions[function](lookup))
+
+    def _get_order(self, order: t.Optional[str]) -> t.List[str]:
+        """Разбор параметров сортировки строк
+
+        Args:
+            order: список имя.направление через запятую
+
+        Returns:
+            список полей сортировки в нотации Django
+        """
+        columns = {column.name: column.lookup for column in self.group + self.aggregates}
+        result = list()
+        for item in self._split((order or "").strip("()")):
+            name, _, direction = item.rpartition(".")
+            if name not in columns or direction not in ("asc", "desc"):
+                raise AggregateError(item)
+            result.append(f"{'-' if direction == 'desc' else ''}{columns[name]}")
+        return result or [column.lookup for column in self.group]
+
+    @staticmethod
+    def _split(value: t.Optional[str]) -> t.List[str]:
+        return [item.strip() for item in (value or "").split(",") if item.strip()]
@@ -0,0 +1,294 @@
+import json
+import logging
+import typing as t
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.db import connection, connections
+from django.http import HttpRequest, QueryDict
+from django.urls import get_script_prefix, get_urlconf, set_script_prefix, set_urlconf
+from django.utils import translation
+from rest_framework import status
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+logger = logging.getLogger("snatch")
+
+BatchItem = namedtuple("BatchItem", ["index", "view", "method", "action", "path", "params", "data"])
+
+
+class BatchAuthentication(BaseAuthentication):
+    """Аутентификация подзапроса пакета: пользователь и токен берутся из запроса пакета (batch_request),
+    аутентифицированного аутентификаторами представления пакета.
+
+    """
+
+    def authenticate(self, request):
+        batch_request = getattr(request, "batch_request", None)
+        if batch_request is None or batch_request.successful_authenticator is None:
+            return None
+        return batch_request.user, batch_request.auth
+
+    def authenticate_header(self, request):
+        batch_request = getattr(request, "batch_request", None)
+        if batch_request is None or not batch_request.authenticators:
+            return None
+        return batch_request.authenticators[0].authenticate_header(batch_request)
+
+
+class SnatchBatchView(APIView):
+    """Пакетное выполнение запросов к эндпойнтам роутера в одном HTTP запросе.
+
+    Тело запроса - список подзапросов вида {"table": "schema/table", "action": "list", "params": {...}, "data": ...}.
+    Подзапросы выполняются представлениями роутера с пользователем, аутентифицированным один раз для пакета
+    (BatchAuthentication вместо аутентификаторов представлений роутера).
+    Идущие подряд подзапросы на чтение (GET) выполняются параллельно в пуле потоков, каждый поток использует
+    собственное соединение с БД. Подзапросы на изменение выполняются последовательно в порядке списка и разделяют
+    группы параллельного чтения. Если пакет выполняется внутри транзакции (ATOMIC_REQUESTS), все подзапросы
+    выполняются последовательно в ней.
+
+    """
+
+    router = None
+    max_requests = settings.SNATCH_FRAMEWORK.get("BATCH_MAX_REQUESTS", 50)
+    max_workers = settings.SNATCH_FRAMEWORK.get("BATCH_WORKERS", 4)
+    skip_headers = {"Content-Type", "Content-Length", "Vary", "Allow"}
+
+    def post(self, request, *args, **kwargs):
+        if not isinstance(request.data, list):
+            return Response(
+                data={"detail": "Тело запроса должно быть списком подзапросов"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if self.max_requests and len(request.data) > self.max_requests:
+            return Response(
+                data={
+                    "detail": f"Количество подзапросов ({len(request.data)}) "
+                    f"больше максимального ({self.max_requests})"
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        results = [None] * len(request.data)
+        group = list()
+        for index, item in enumerate(request.data):
+            try:
+                item = self.get_item(index, item)
+            except ValueError as ex:
+                results[index] = self.get_error(status.HTTP_400_BAD_REQUEST, str(ex))
+                continue
+            except LookupError as ex:
+                results[index] = self.get_error(status.HTTP_404_NOT_FOUND, str(ex))
+                continue
+            if item.method == "get":
+                group.append(item)
+                continue
+            self.run_group(request, group, results)
+            group = list()
+            results[index] = self.run_item(request, item)
+        self.run_group(request, group, results)
+        return Response(data=results)
+
+    def get_item(self, index: int, item: t.Any) -> BatchItem:
+        """Разбор подзапроса
+
+        Args:
+            index: индекс подзапроса
+            item: подзапрос из тела запроса
+
+        Returns:
+            подзапрос
+        """
+        if not isinstance(item, dict) or "table" not in item or "action" not in item:
+            raise ValueError("Подзапрос должен содержать ключи table и action")
+        params = item.get("params") or dict()
+        if not isinstance(params, dict):
+            raise ValueError("Параметры подзапроса должны быть объектом")
+
+        table, action = item["table"], item["action"]
+        view_class = next(
+            (
+                viewset
+                for prefix, viewset, basename in self.router.registry
+                if prefix == table
+            ),
+            None,
+        )
+        if view_class is None:
+            raise LookupError(f"Таблица {table} не найдена")
+        for route in self.router.get_routes(view_class):
+            if "{lookup}" in route.url:
+                continue
+            for method, route_action in self.router.get_method_map(view_class, route.mapping).items():
+                if route_action != action:
+                    continue
+                view = view_class.as_view(
+                    {method: action}, authentication_classes=[BatchAuthentication], **route.initkwargs
+                )
+                path = route.url.format(prefix=table, trailing_slash="").strip("^$")
+                return BatchItem(index, view, method, action, path, params, item.get("data"))
+        raise LookupError(f"Действие {action} не найдено для таблицы {table}")
+
+    def run_group(self, request, group: t.List[BatchItem], results: t.List):
+        """Выполнение группы подзапросов на чтение
+
+        Args:
+            request: запрос пакета
+            group: подзапросы на чтение
+            results: список результатов для заполнения
+
+        Returns:
+
+        """
+        if len(group) < 2 or self.max_workers < 2 or connection.in_atomic_block:
+            for item in group:
+                results[item.index] = self.run_item(request, item)
+            return
+
+        state = (get_script_prefix(), get_urlconf(), translation.get_language())
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(group))) as executor:
+            futures = [
+                executor.submit(self.run_thread_item, request, item, state) for item in group
+            ]
+            for item, future in zip(group, futures):
+                results[item.index] = future.result()
+
+    def run_thread_item(self, request, item: BatchItem, state: t.Tuple) -> t.Dict:
+        """Выполнение подзапроса в потоке пула
+
+        Args:
+            request: запрос пакета
+            item: подзапрос
+            state: префикс скрипта, urlconf и язык потока запроса пакета
+
+        Returns:
+            результат подзапроса
+        """
+        script_prefix, urlconf, language = state
+        set_script_prefix(script_prefix)
+        set_urlconf(urlconf)
+        try:
+            with translation.override(language):
+                return self.run_item(request, item)
+        finally:
+            connections.close_all()
+
+    def run_item(self, request, item: BatchItem) -> t.Dict:
+        """Выполнение подзапроса представлением роутера
+
+        Args:
+            request: запрос пакета
+            item: подзапрос
+
+        Returns:
+            результат подзапроса: статус, заголовки и данные ответа
+        """
+        try:
+            response = item.view(self.get_request(request, item))
+            data = self.get_data(response)
+        except Exception:
+            logger.exception("Ошибка выполнения подзапроса %s %s", item.method.upper(), item.path)
+            return self.get_error(
+                status.HTTP_500_INTERNAL_SERVER_ERROR, "Внутренняя ошибка сервера при выполнении подзапроса"
+            )
+
+        result = OrderedDict()
+        result["status"] = response.status_code
+        result["headers"] = {
+            key: value for key, value in response.items() if key not in self.skip_headers
+        }
+        result["data"] = data
+        return result
+
+    def get_data(self, response) -> t.Any:
+        """Получение данных ответа подзапроса. Потоковый ответ читается полностью; ответ в формате JSON
+        разбирается, иной ответ (например, /export в формате csv) возвращается текстом.
+
+        Args:
+            response: ответ подзапроса
+
+        Returns:
+            данные ответа
+        """
+        if not getattr(response, "streaming", False) and hasattr(response, "data"):
+            return response.data
+        try:
+            content = (
+                b"".join(response.streaming_content)
+                if getattr(response, "streaming", False)
+                else response.content
+            )
+        finally:
+            response.close()
+        if not content:
+            return None
+        content_type = response.get("Content-Type", "").split(";")[0].strip()
+        if content_type == "application/json" or content_type.endswith("+json"):
+            return json.loads(content)
+        return content.decode(response.charset)
+
+    def get_request(self, request, item: BatchItem) -> HttpRequest:
+        """Получение запроса Django для подзапроса
+
+        Подзапрос передает запрос пакета в batch_request: BatchAuthentication использует его пользователя и токен,
+        поэтому аутентификация не выполняется повторно.
+
+        Args:
+            request: запрос пакета
+            item: подзапрос
+
+        Returns:
+            запрос Django
+        """
+        sub_request = HttpRequest()
+        sub_request.META = request.META.copy()
+        sub_request.method = item.method.upper()
+        sub_request.META["REQUEST_METHOD"] = sub_request.method
+        sub_request.path = sub_request.path_info = self.get_path(request, item)
+
+        query = QueryDict(mutable=True)
+        for key, value in item.params.items():
+            if isinstance(value, list):
+                query.setlist(key, [str(v) for v in value])
+            else:
+                query[key] = "" if value is None else str(value)
+        sub_request.GET = query
+        sub_request.META["QUERY_STRING"] = query.urlencode()
+
+        body = json.dumps(item.data).encode() if item.data is not None else b""
+        sub_request.META["CONTENT_TYPE"] = "application/json"
+        sub_request.META["CONTENT_LENGTH"] = str(len(body))
+        sub_request._stream = BytesIO(body)
+        sub_request._read_started = False
+
+        sub_request.batch_request = request
+        return sub_request
+
+    @staticmethod
+    def get_path(request, item: BatchItem) -> str:
+        """Получение пути подзапроса относительно пути эндпойнта пакета
+
+        Args:
+            request: запрос пакета
+            item: подзапрос
+
+        Returns:
+            путь подзапроса
+        """
+        return f"{request.path.rsplit('/', 1)[0]}/{item.path}"
+
+    @staticmethod
+    def get_error(status_code: int, detail: str) -> t.Dict:
+        """Получение результата подзапроса с ошибкой
+
+        Args:
+            status_code: статус ответа
+            detail: описание ошибки
+
+        Returns:
+            результат подзапроса
+        """
+        return OrderedDict([("status", status_code), ("headers", dict()), ("data", {"detail": detail})])
@@ -0,0 +1,310 @@
+import typing as t
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import Model, QuerySet
+from rest_framework.utils import model_meta
+
+from snatch.exceptions import BulkIntegrityException, BulkValidationException
+from snatch.versions import table_versions
+
+
+class BulkWriter:
+    """Пакетные создание, изменение и удаление объектов модели.
+
+    Сначала валидируются все элементы списка (ошибки собираются с указанием индекса элемента), затем
+    объекты записываются через bulk_create/bulk_update/delete порциями по batch_size в одной транзакции.
+    Нарушение ограничения целостности БД отменяет транзакцию и возвращается с диапазоном индексов порции
+    (BulkIntegrityException); в PostgreSQL отложенные ограничения проверяются после каждой порции, в остальных
+    БД ошибка при фиксации транзакции относится ко всему списку.
+    Объекты отношений, указанные в элементах, загружаются одним запросом на отношение до валидации
+    и передаются сериализатору через контекст (related_objects).
+
+    """
+
+    def __init__(self, serializer_class, context: t.Dict, batch_size: int = 1000):
+        self.serializer_class = serializer_class
+        self.context = context
+        self.batch_size = batch_size
+        self.model = serializer_class.Meta.model
+        self.pk_name = self.model._meta.pk.name
+
+    def create(self, items: t.List) -> t.List[Model]:
+        """Пакетное создание объектов
+
+        Args:
+            items: список данных объектов
+
+        Returns:
+            список созданных объектов
+        """
+        validated = self._validate(items, [None] * len(items), list())
+        objects, many_to_many = list(), list()
+        for data in validated:
+            data = dict(data)
+            many_to_many.append(self._pop_many_to_many(data))
+            objects.append(self.model(**data))
+        using = router.db_for_write(self.model)
+
+        def write(start: int, batch: t.List[Model]):
+            self.model._default_manager.bulk_create(batch)
+            self._set_many_to_many(batch, many_to_many[start : start + len(batch)])
+
+        self._write(using, objects, write)
+        table_versions.bump(self.model, using=using)
+        return objects
+
+    def update(self, queryset: QuerySet, items: t.List) -> t.List[Model]:
+        """Пакетное изменение объектов (элементы должны содержать первичный ключ)
+
+        Args:
+            queryset: множество записей, в котором ищутся изменяемые объекты
+            items: список данных объектов
+
+        Returns:
+            список измененных объектов
+        """
+        errors = list()
+        pks = self._get_pks(items, errors)
+        instances = self._get_instances(queryset, pks, errors)
+        validated = self._validate(items, instances, errors)
+
+        fields = set()
+        many_to_many = list()
+        for instance, data in zip(instances, validated):
+            data = dict(data)
+            many_to_many.append(self._pop_many_to_many(data))
+            for attr, value in data.items():
+                setattr(instance, attr, value)
+            fields.update(data.keys())
+        fields.discard(self.pk_name)
+        using = router.db_for_write(self.model)
+
+        def write(start: int, batch: t.List[Model]):
+            if fields:
+                self.model._default_manager.bulk_update(batch, sorted(fields))
+            self._set_many_to_many(batch, many_to_many[start : start + len(batch)])
+
+        self._write(using, instances, write)
+        table_versions.bump(self.model, using=using)
+        return instances
+
+    def delete(self, queryset: QuerySet, items: t.List) -> int:
+        """Пакетное удаление объектов
+
+        Args:
+            queryset: множество записей, из которого удаляются объекты
+            items: список первичных ключей или данных объектов
+
+        Returns:
+            количество удаленных объектов
+        """
+        errors = list()
+        pks = self._get_pks(items, errors)
+        self._get_instances(queryset.only(self.pk_name), pks, errors)
+        if errors:
+            raise BulkValidationException(self.model._meta.object_name, errors)
+        deleted = [0]
+
+        def write(start: int, batch: t.List[t.Any]):
+            deleted[0] += queryset.filter(pk__in=batch).delete()[0]
+
+        self._write(router.db_for_write(self.model), pks, write)
+        return deleted[0]
+
+    def _write(self, using: str, values: t.List, write: t.Callable[[int, t.List], None]):
+        """Запись порций элементов в одной транзакции
+
+        Args:
+            using: алиас БД для записи
+            values: объекты или первичные ключи элементов
+            write: функция записи порции (индекс первого элемента порции, порция)
+
+        Returns:
+
+        """
+        connection = connections[using]
+        class_name = self.model._meta.object_name
+        try:
+            with transaction.atomic(using=using):
+                for start in range(0, len(values), self.batch_size):
+                    batch = values[start : start + self.batch_size]
+                    try:
+                        write(start, batch)
+                        if connection.vendor == "postgresql":
+                            connection.check_constraints()
+                    except IntegrityError as ex:
+                        end = start + len(batch) - 1
+                        raise BulkIntegrityException(class_name, start, end, str(ex).strip()) from ex
+        except IntegrityError as ex:
+            raise BulkIntegrityException(class_name, 0, len(values) - 1, str(ex).strip()) from ex
+
+    def _validate(
+        self, items: t.List, instances: t.List[t.Optional[Model]], errors: t.List[t.Dict]
+    ) -> t.List[t.Dict]:
+        """Валидация всех элементов списка
+
+        Args:
+            items: список данных объектов
+            instances: изменяемые объекты (None для создаваемых)
+            errors: ошибки, найденные до валидации
+
+        Returns:
+            список валидных данных объектов
+        """
+        context = dict(self.context)
+        context["related_objects"] = self._get_related_objects(items)
+        failed = {error["index"] for error in errors}
+        validated = list()
+        for index, (item, instance) in enumerate(zip(items, instances)):
+            if index in failed:
+                continue
+            serializer = self.serializer_class(instance, data=item, context=context)
+            if serializer.is_valid():
+                validated.append(serializer.validated_data)
+            else:
+                errors.append({"index": index, "errors": serializer.errors})
+        if errors:
+            errors.sort(key=lambda error: error["index"])
+            raise BulkValidationException(self.model._meta.object_name, errors)
+        return validated
+
+    def _get_pks(self, items: t.List, errors: t.List[t.Dict]) -> t.List[t.Any]:
+        """Получение первичных ключей элементов списка
+
+        Args:
+            items: список первичных ключей или данных объектов
+            errors: список для добавления ошибок
+
+        Returns:
+            список первичных ключей (None для элементов с ошибкой)
+        """
+        pk_field = self.model._meta.pk
+        pks, seen = list(), set()
+        for index, item in enumerate(items):
+            if isinstance(item, dict):
+                item = item.get("self") if "self" in item else item
+                item = item.get(self.pk_name) if isinstance(item, dict) else None
+            pk = None
+            if item is None:
+                errors.append(
+                    {"index": index, "errors": {self.pk_name: ["не указан первичный ключ"]}}
+                )
+            else:
+                try:
+                    pk = pk_field.to_python(item)
+                except ValidationError as ex:
+                    errors.append({"index": index, "errors": {self.pk_name: ex.messages}})
+            if pk is not None and pk in seen:
+                errors.append(
+                    {"index": index, "errors": {self.pk_name: ["объект указан повторно"]}}
+                )
+                pk = None
+            if pk is not None:
+                seen.add(pk)
+            pks.append(pk)
+        return pks
+
+    def _get_instances(
+        self, queryset: QuerySet, pks: t.List[t.Any], errors: t.List[t.Dict]
+    ) -> t.List[t.Optional[Model]]:
+        """Получение объектов по первичным ключам порциями по batch_size
+
+        Args:
+            queryset: множество записей
+            pks: список первичных ключей
+            errors: список для добавления ошибок
+
+        Returns:
+            список объектов (None для ненайденных)
+        """
+        found = dict()
+        for batch in self._batches([pk for pk in pks if pk is not None]):
+            found.update(queryset.in_bulk(batch))
+        instances = list()
+        for index, pk in enumerate(pks):
+            instance = found.get(pk)
+            if pk is not None and instance is None:
+                errors.append({"index": index, "errors": {self.pk_name: ["объект не найден"]}})
+            instances.append(instance)
+        return instances
+
+    def _get_related_objects(self, items: t.List) -> t.Dict[t.Tuple, Model]:
+        """Загрузка объектов отношений, указанных в элементах списка, одним запросом на отношение
+
+        Args:
+            items: список данных объектов
+
+        Returns:
+            словарь (модель отношения, первичный ключ в виде строки) -> объект
+        """
+        related_objects = dict()
+        serializer = self.serializer_class()
+        for field in serializer._writable_fields:
+            try:
+                model_field = self.model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                continue
+            if not model_field.many_to_one:
+                continue
+            related_model = model_field.related_model
+            pk_name = related_model._meta.pk.name
+            pks = set()
+            for item in items:
+                data = item.get(field.field_name) if isinstance(item, dict) else None
+                if isinstance(data, dict):
+                    data = data.get("self") if "self" in data else data
+                    if isinstance(data, dict) and data.get(pk_name):
+                        pks.add(data[pk_name])
+            try:
+                for batch in self._batches(list(pks)):
+                    objects = related_model.objects.in_bulk(batch)
+                    related_objects.update(
+                        {(related_model, str(pk)): obj for pk, obj in objects.items()}
+                    )
+            except (ValidationError, ValueError, TypeError):
+                continue
+        return related_objects
+
+    def _batches(self, values: t.List) -> t.Iterator[t.List]:
+        """Разбиение списка на порции по batch_size
+
+        Args:
+            values: список значений
+
+        Returns:
+            итератор порций
+        """
+        for i in range(0, len(values), self.batch_size):
+            yield values[i : i + self.batch_size]
+
+    def _pop_many_to_many(self, data: t.Dict) -> t.Dict:
+        """Извлечение значений множественных отношений из данных объекта
+
+        Args:
+            data: валидные данные объекта
+
+        Returns:
+            значения множественных отношений
+        """
+        info = model_meta.get_field_info(self.model)
+        return {
+            name: data.pop(name)
+            for name in list(data)
+            if name in info.relations and info.relations[name].to_many
+        }
+
+    @staticmethod
+    def _set_many_to_many(objects: t.List[Model], many_to_many: t.List[t.Dict]):
+        """Установка значений множественных отношений после записи объектов
+
+        Args:
+            objects: список объектов
+            many_to_many: значения множественных отношений для каждого объекта
+
+        Returns:
+
+        """
+        for instance, values in zip(objects, many_to_many):
+            for name, value in values.items():
+                getattr(instance, name).set(value)
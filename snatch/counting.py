@@ -0,0 +1,86 @@
+import hashlib
+import typing as t
+
+from django.core.cache import caches
+from django.db import connections
+from django.db.models import QuerySet
+
+from snatch.utils import explain_plan
+
+COUNT_MODES = ("exact", "estimate", "capped", "cached")
+
+
+class QueryCounter:
+    """Подсчет количества записей в одном из режимов:
+        - exact - точное количество (COUNT(*))
+        - estimate - оценка PostgreSQL: pg_class.reltuples без фильтра, оценка строк плана (EXPLAIN) с фильтром
+        - capped - точное количество, но не более cap + 1 (cap + 1 означает "больше cap")
+        - cached - точное количество с кэшированием на ttl секунд
+
+    Если режим не поддерживается БД, используется точный подсчет. Вместе с количеством возвращается режим,
+    которым оно фактически получено.
+
+    """
+
+    def __init__(self, cap: int = 1000, ttl: int = 60, cache_alias: str = "default"):
+        self.cap = cap
+        self.ttl = ttl
+        self.cache_alias = cache_alias
+
+    def __call__(self, queryset: QuerySet, mode: str = "exact") -> t.Tuple[int, str]:
+        """Подсчет количества записей
+
+        Args:
+            queryset: множество записей
+            mode: режим подсчета
+
+        Returns:
+            количество записей, режим подсчета
+        """
+        func = getattr(self, f"_{mode}_count")
+        return func(queryset)
+
+    def _exact_count(self, queryset: QuerySet) -> t.Tuple[int, str]:
+        return queryset.count(), "exact"
+
+    def _capped_count(self, queryset: QuerySet) -> t.Tuple[int, str]:
+        return queryset[: self.cap + 1].count(), "capped"
+
+    def _cached_count(self, queryset: QuerySet) -> t.Tuple[int, str]:
+        sql, params = queryset.query.get_compiler(using=queryset.db).as_sql()
+        key = "snatch:count:{}".format(
+            hashlib.sha1(f"{queryset.db}:{sql}:{params!r}".encode()).hexdigest()
+        )
+        cache = caches[self.cache_alias]
+        count = cache.get(key)
+        if count is None:
+            count = queryset.count()
+            cache.set(key, count, self.ttl)
+        return count, "cached"
+
+    def _estimate_count(self, queryset: QuerySet) -> t.Tuple[int, str]:
+        connection = connections[queryset.db]
+        if connection.vendor != "postgresql":
+            return self._exact_count(queryset)
+
+        query = queryset.query
+        low_mark, high_mark = query.low_mark, query.high_mark
+        unsliced = queryset.all()
+        unsliced.query.clear_limits()
+
+        count = None
+        if not query.where and not query.distinct:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples FROM pg_class WHERE oid = %s::regclass",
+                    [connection.ops.quote_name(queryset.model._meta.db_table)],
+                )
+                row = cursor.fetchone()
+            count = int(row[0]) if row and row[0] > 0 else None
+        if count is None:
+            count = int(explain_plan(unsliced)["Plan Rows"])
+
+        count = max(count - low_mark, 0)
+        if high_mark is not None:
+            count = min(count, high_mark - low_mark)
+        return count, "estimate"
@@ -32,6 +32,90 @@ class ModelFilterException(Exception):
         return f"<ModelFilterException> Ошибка в параметрах фильтрации для модели {self.class_name}: {self.ex}."
 
 
+class QueryCostException(Exception):
+    """ Ошибка превышения допустимой стоимости запроса. """
+    def __init__(self, class_name, detail, cost=None):
+        self.class_name = class_name
+        self.detail = detail
+        self.cost = cost
+
+    def __str__(self):
+        return f"<QueryCostException> Запрос к модели {self.class_name} отклонен: {self.detail}."
+
+
+class QueryTimeoutException(Exception):
+    """ Ошибка превышения времени выполнения запросов к БД. """
+
+    _kind_list = {
+        "statement": "превышено время выполнения SQL запроса",
+        "budget": "превышено суммарное время выполнения SQL запросов",
+    }
+
+    def __init__(self, class_name, kind, elapsed, limit):
+        self.class_name = class_name
+        self.kind = kind
+        self.elapsed = elapsed
+        self.limit = limit
+
+    def __str__(self):
+        return (
+            f"<QueryTimeoutException> Запрос к модели {self.class_name} прерван: "
+            f"{self._kind_list[self.kind]} ({self.elapsed} мс, ограничение {self.limit} мс)."
+        )
+
+
+class BulkValidationException(Exception):
+    """ Ошибка валидации элементов пакетной операции. """
+    def __init__(self, class_name, errors):
+        self.class_name = class_name
+        self.errors = errors
+
+    def __str__(self):
+        return (
+            f"<BulkValidationException> Ошибка валидации элементов пакетной операции для модели {self.class_name}: "
+            f"невалидных элементов {len(self.errors)}."
+        )
+
+
+class BulkIntegrityException(Exception):
+    """ Нарушение ограничения целостности БД при записи порции элементов пакетной операции. """
+    def __init__(self, class_name, start, end, detail):
+        self.class_name = class_name
+        self.start = start
+        self.end = end
+        self.detail = detail
+
+    def __str__(self):
+        return (
+            f"<BulkIntegrityException> Пакетная операция для модели {self.class_name} отменена: "
+            f"нарушено ограничение целостности в элементах {self.start}-{self.end}: {self.detail}."
+        )
+
+
+class MassOperationException(Exception):
+    """ Ошибка превышения допустимого количества записей массовой операции. """
+    def __init__(self, class_name, count, max_rows):
+        self.class_name = class_name
+        self.count = count
+        self.max_rows = max_rows
+
+    def __str__(self):
+        return (
+            f"<MassOperationException> Операция над моделью {self.class_name} отменена: затронуто записей "
+            f"{self.count}, допустимо не более {self.max_rows}."
+        )
+
+
+class ImportException(Exception):
+    """ Ошибка формата или заголовка загружаемого потока. """
+    def __init__(self, class_name, detail):
+        self.class_name = class_name
+        self.detail = detail
+
+    def __str__(self):
+        return f"<ImportException> Загрузка записей модели {self.class_name} отменена: {self.detail}."
+
+
 class FilterException(Exception):
     """ Ошибка при построении параметров фильтрации. """
     def __init__(self, input_string):
@@ -44,6 +128,21 @@ class BracketsError(FilterException):
         return f"<BracketsError> Невалидное количество скобок в строке {self.input_string}."
 
 
+class QuerySyntaxError(FilterException):
+    """ Ошибка синтаксиса строки запроса с указанием позиции. """
+
+    def __init__(self, input_string, position, detail):
+        self.input_string = input_string
+        self.position = position
+        self.detail = detail
+
+    def __str__(self):
+        return (
+            f"<QuerySyntaxError> Ошибка синтаксиса в позиции {self.position} строки {self.input_string}: "
+            f"{self.detail}."
+        )
+
+
 class AttributesException(FilterException):
     """ Ошибка при валидации атрибутов модели. """
 
@@ -75,3 +174,27 @@ class NotValidOperatorError(OperatorsException):
     """ Ошибка невалидного оператора в запросе. """
     def __str__(self):
         return f"<NotValidOperatorError> Неверная оператор для фильтрации: {self.operator}."
+
+
+class NotValidValueError(OperatorsException):
+    """ Ошибка невалидного значения оператора в запросе. """
+    def __str__(self):
+        return f"<NotValidValueError> Неверное значение {self.value} для оператора фильтрации: {self.operator}."
+
+
+class AggregateError(FilterException):
+    """ Ошибка в выражении группировки, агрегации или сортировки агрегатов. """
+    def __str__(self):
+        return f"<AggregateError> Неверное выражение агрегации {self.input_string}."
+
+
+class CursorError(FilterException):
+    """ Ошибка при разборе курсора постраничного вывода. """
+    def __str__(self):
+        return f"<CursorError> Невалидный курсор {self.input_string}."
+
+
+class UnknownFieldError(FilterException):
+    """ Ошибка в пути поля параметра fields. """
+    def __str__(self):
+        return f"<UnknownFieldError> Поле {self.input_string} не выводится сериализатором."
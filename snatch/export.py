@@ -0,0 +1,288 @@
+import csv
+import datetime
+import decimal
+import io
+import json
+import queue
+import threading
+import typing as t
+import uuid
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import Model, QuerySet
+
+from snatch.search.paths import field_paths
+from snatch.search.validators import validate_attributes
+
+encoder = DjangoJSONEncoder()
+
+
+def format_value(value: t.Any) -> t.Any:
+    """Приведение значения колонки выгрузки к формату, одинаковому для всех БД: дата и время, интервалы и UUID -
+    строки DjangoJSONEncoder, дробные числа - строки без экспоненты
+
+    Args:
+        value: значение колонки
+
+    Returns:
+        значение для JSON
+    """
+    if isinstance(value, decimal.Decimal):
+        return format(value, "f")
+    if isinstance(value, (datetime.date, datetime.time, datetime.timedelta, uuid.UUID)):
+        return encoder.default(value)
+    return value
+
+
+class Exporter:
+    """Потоковая выгрузка записей в формате NDJSON или CSV без сериализаторов DRF.
+
+    Колонки выгрузки - пути атрибутов модели из параметра fields в порядке параметра (по-умолчанию - все поля
+    модели, для отношений выгружается первичный ключ). В PostgreSQL SQL запрос values_list() выполняется через
+    COPY (SELECT ...) TO STDOUT, а данные COPY передаются в ответ порциями по мере получения из БД
+    (copy_expert выполняется в отдельном потоке, очередь порций ограничена). Для остальных БД строки
+    читаются итератором QuerySet порциями по chunk_size.
+
+    Значения выгружаются одинаково для всех БД (format_value): в PostgreSQL дата и время, интервалы, дробные
+    и логические значения форматируются в запросе COPY.
+
+    """
+
+    formats = ("ndjson", "csv")
+    content_types = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+    copy_queue_size = 16
+    copy_buffer_size = 65536
+
+    def __init__(self, export_format: str = "ndjson", chunk_size: int = 2000):
+        self.export_format = export_format
+        self.chunk_size = chunk_size
+
+    @property
+    def content_type(self) -> str:
+        return f"{self.content_types[self.export_format]}; charset=utf-8"
+
+    def __call__(self, queryset: QuerySet, columns: t.List[t.Tuple[str, str]]) -> t.Iterator[bytes]:
+        """Получение фрагментов выгрузки
+
+        Args:
+            queryset: отфильтрованное и отсортированное множество записей
+            columns: список (имя колонки, путь в нотации Django)
+
+        Returns:
+            итератор фрагментов ответа
+        """
+        rows = queryset.prefetch_related(None).values_list(*[lookup for _, lookup in columns])
+        if connections[rows.db].vendor == "postgresql":
+            return self._copy(rows, [name for name, _ in columns], self._get_types(rows.model, columns))
+        return self._iterate(rows, [name for name, _ in columns])
+
+    def get_columns(self, model: type(Model), fields_string: t.Optional[str]) -> t.List[t.Tuple[str, str]]:
+        """Получение колонок выгрузки по всем путям параметра fields (в том числе путям отношений,
+        дочерние поля которых также указаны)
+
+        Args:
+            model: модель
+            fields_string: значение параметра fields (список путей полей через запятую)
+
+        Returns:
+            список (имя колонки, путь в нотации Django)
+        """
+        paths = [path.strip() for path in (fields_string or "").split(",") if path.strip()]
+        if not paths:
+            return [(field.name, field.name) for field in model._meta.concrete_fields]
+        columns = list()
+        for path in paths:
+            attributes = [name for name in path.split(".") if name]
+            validate_attributes(attributes, model)
+            column = (".".join(attributes), "__".join(attributes))
+            if column not in columns:
+                columns.append(column)
+        return columns
+
+    @staticmethod
+    def _get_types(model: type(Model), columns: t.List[t.Tuple[str, str]]) -> t.List[str]:
+        """Получение типов полей колонок (для отношений - тип первичного ключа модели отношения)
+
+        Args:
+            model: модель
+            columns: список (имя колонки, путь в нотации Django)
+
+        Returns:
+            список внутренних типов полей Django
+        """
+        types = list()
+        for _, lookup in columns:
+            info = field_paths.resolve(model, lookup.split("__"))
+            field = info.related_model._meta.pk if info.is_relation else info.field
+            types.append(field.get_internal_type())
+        return types
+
+    def _get_expression(self, column: str, internal_type: str) -> str:
+        """Получение выражения PostgreSQL для значения колонки в формате format_value
+
+        Args:
+            column: колонка запроса
+            internal_type: внутренний тип поля Django
+
+        Returns:
+            выражение SQL
+        """
+        if internal_type == "DateTimeField":
+            value = f"{column} AT TIME ZONE 'UTC'" if settings.USE_TZ else column
+            return (
+                f"to_char({value}, 'YYYY-MM-DD\"T\"HH24:MI:SS') || CASE WHEN "
+                f"CAST(date_part('microseconds', {column}) AS bigint) % 1000000 <> 0 "
+                f"THEN to_char({value}, '.MS') ELSE '' END" + (" || 'Z'" if settings.USE_TZ else "")
+            )
+        if internal_type == "TimeField":
+            value = f"CAST({column} AS interval)"
+            return (
+                f"to_char({value}, 'HH24:MI:SS') || CASE WHEN "
+                f"CAST(date_part('microseconds', {column}) AS bigint) % 1000000 <> 0 "
+                f"THEN to_char({value}, '.MS') ELSE '' END"
+            )
+        if internal_type == "DurationField":
+            micro = f"CAST(round(extract(epoch FROM {column}) * 1000000) AS bigint)"
+            total = f"abs({micro})"
+            return (
+                f"CASE WHEN {micro} < 0 THEN '-' ELSE '' END || 'P' || ({total} / 86400000000) || 'DT' "
+                f"|| lpad(CAST({total} / 3600000000 % 24 AS text), 2, '0') || 'H' "
+                f"|| lpad(CAST({total} / 60000000 % 60 AS text), 2, '0') || 'M' "
+                f"|| lpad(CAST({total} / 1000000 % 60 AS text), 2, '0') "
+                f"|| CASE WHEN {total} % 1000000 <> 0 THEN '.' || lpad(CAST({total} % 1000000 AS text), 6, '0') "
+                f"ELSE '' END || 'S'"
+            )
+        if internal_type == "DecimalField":
+            return f"CAST({column} AS text)"
+        if internal_type in ("BooleanField", "NullBooleanField") and self.export_format == "csv":
+            return f"CASE WHEN {column} THEN 'true' WHEN NOT {column} THEN 'false' END"
+        return column
+
+    def _iterate(self, rows: QuerySet, names: t.List[str]) -> t.Iterator[bytes]:
+        """Выгрузка через итератор QuerySet
+
+        Args:
+            rows: множество строк values_list()
+            names: имена колонок
+
+        Returns:
+            итератор фрагментов ответа
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        if self.export_format == "csv":
+            writer.writerow(names)
+        for index, row in enumerate(rows.iterator(chunk_size=self.chunk_size), 1):
+            row = [format_value(value) for value in row]
+            if self.export_format == "csv":
+                writer.writerow([self._get_csv_value(value) for value in row])
+            else:
+                buffer.write(json.dumps(dict(zip(names, row)), ensure_ascii=False, separators=(",", ":")))
+                buffer.write("\n")
+            if index % self.chunk_size == 0:
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode()
+
+    @staticmethod
+    def _get_csv_value(value: t.Any) -> t.Any:
+        """Получение значения ячейки CSV в формате COPY PostgreSQL
+
+        Args:
+            value: значение колонки после format_value
+
+        Returns:
+            значение ячейки
+        """
+        if value is None:
+            return ""
+        if isinstance(value, bool):
+            return "true" if value else "false"
+        if isinstance(value, (dict, list)):
+            return json.dumps(value, ensure_ascii=False)
+        return value
+
+    def _copy(self, rows: QuerySet, names: t.List[str], types: t.List[str]) -> t.Iterator[bytes]:
+        """Выгрузка через COPY TO STDOUT PostgreSQL
+
+        NDJSON формируется функцией row_to_json() в формате COPY csv с разделителем и кавычками, которые
+        не встречаются в JSON, поэтому строки JSON передаются без экранирования.
+
+        Args:
+            rows: множество строк values_list()
+            names: имена колонок
+            types: внутренние типы полей колонок
+
+        Returns:
+            итератор фрагментов ответа
+        """
+        connection = connections[rows.db]
+        sql, params = rows.query.get_compiler(using=rows.db).as_sql()
+        quote = connection.ops.quote_name
+        aliases = ", ".join(quote(name) for name in names)
+        expressions = ", ".join(
+            f"{self._get_expression(f'snatch_export.{quote(name)}', internal_type)} AS {quote(name)}"
+            for name, internal_type in zip(names, types)
+        )
+        with connection.cursor() as cursor:
+            query = cursor.mogrify(sql, params)
+        query = query.decode() if isinstance(query, bytes) else query
+        query = f"SELECT {expressions} FROM ({query}) AS snatch_export({aliases})"
+        if self.export_format == "csv":
+            copy_sql = f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER)"
+        else:
+            copy_sql = (
+                f"COPY (SELECT row_to_json(snatch_row) FROM ({query}) AS snatch_row) "
+                f"TO STDOUT WITH (FORMAT csv, QUOTE E'\\x01', DELIMITER E'\\x02')"
+            )
+
+        chunks = queue.Queue(maxsize=self.copy_queue_size)
+        stopped = threading.Event()
+        finished = object()
+
+        class Output:
+            @staticmethod
+            def write(data):
+                while not stopped.is_set():
+                    try:
+                        chunks.put(bytes(data), timeout=1)
+                        return
+                    except queue.Full:
+                        continue
+                raise IOError("Выгрузка прервана")
+
+        def copy(cursor):
+            try:
+                cursor.copy_expert(copy_sql, Output(), size=self.copy_buffer_size)
+                chunks.put(finished)
+            except Exception as ex:
+                chunks.put(ex)
+
+        connection.ensure_connection()
+        cursor = connection.connection.cursor()
+        thread = threading.Thread(target=copy, args=(cursor,), daemon=True)
+        thread.start()
+        completed = False
+        try:
+            while True:
+                chunk = chunks.get()
+                if chunk is finished:
+                    completed = True
+                    return
+                if isinstance(chunk, Exception):
+                    raise chunk
+                yield chunk
+        finally:
+            stopped.set()
+            while thread.is_alive():
+                try:
+                    chunks.get_nowait()
+                except queue.Empty:
+                    thread.join(0.1)
+            cursor.close()
+            if not completed:
+                connection.close()
@@ -1,3 +1,6 @@
+import sys
+
+from django.utils.module_loading import import_string
 from rest_framework.fields import Field
 
 from snatch.wrappers import add_link_many
@@ -6,9 +9,18 @@ from snatch.wrappers import add_link_many
 class SnatchSerializerMethodField(Field):
     """Метод сериализатора, который оборачивает данные в self и link.
 
+    Параметр serializer_class (класс, путь для импорта или наименование класса из модуля родительского
+    сериализатора) описывает сериализатор дочерних объектов и используется для построения
+    оптимального запроса к БД.
+
+    Отношение, которое загружает метод, задается декоратором load_relation (по-умолчанию - отношение
+    с именем поля). В метод передается менеджер этого отношения, а дочерние объекты загружаются пакетно
+    для всех родительских объектов списка (QueryPlanner.prefetch).
+
     """
-    def __init__(self, method_name=None, source=None, **kwargs):
+    def __init__(self, method_name=None, source=None, serializer_class=None, **kwargs):
         self.method_name = method_name
+        self.serializer_class = serializer_class
         kwargs["source"] = "*"
         kwargs["read_only"] = True
         super().__init__(**kwargs)
@@ -25,10 +37,25 @@ class SnatchSerializerMethodField(Field):
             self.label = field_name.replace("_", " ").capitalize()
 
         if self.source is None:
-            self.source = field_name
+            method = getattr(parent, self.method_name, None)
+            self.source = getattr(method, "snatch_relation", None) or field_name
 
         self.source_attrs = [] if self.source == "*" else self.source.split(".")
 
+    def get_serializer_class(self):
+        """Получение класса сериализатора дочерних объектов
+
+        Returns:
+            класс сериализатора или None, если он не указан
+        """
+        if isinstance(self.serializer_class, str):
+            if "." in self.serializer_class:
+                self.serializer_class = import_string(self.serializer_class)
+            else:
+                module = sys.modules[type(self.parent).__module__]
+                self.serializer_class = getattr(module, self.serializer_class)
+        return self.serializer_class
+
     @add_link_many
     def to_representation(self, value):
         method = getattr(self.parent, self.method_name)
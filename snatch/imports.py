@@ -0,0 +1,666 @@
+import codecs
+import csv
+import json
+import typing as t
+import uuid
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, connections, router, transaction
+from django.db.models import AutoField, CharField, Field, Model, TextField
+
+from snatch.exceptions import ImportException
+from snatch.versions import table_versions
+
+IMPORT_ERRORS = {
+    "parse": "строка не разобрана",
+    "unknown": "неизвестное поле",
+    "columns": "поле отсутствует в первой строке",
+    "invalid": "неверное значение",
+    "too_long": "значение длиннее допустимого",
+    "required": "значение не указано",
+    "not_found": "объект не найден",
+    "duplicate": "первичный ключ указан повторно",
+    "exists": "объект уже существует",
+}
+
+INTEGER_PATTERN = r"^\s*[+-]?[0-9]+\s*$"
+NUMBER_PATTERN = r"^\s*[+-]?([0-9]+\.?[0-9]*|\.[0-9]+)([eE][+-]?[0-9]{1,4})?\s*$"
+UUID_PATTERN = (
+    r"^\s*(\{[0-9a-f]{8}-?([0-9a-f]{4}-?){3}[0-9a-f]{12}\}|[0-9a-f]{8}-?([0-9a-f]{4}-?){3}[0-9a-f]{12})\s*$"
+)
+BOOLEAN_VALUES = ("t", "true", "y", "yes", "on", "1", "f", "false", "n", "no", "off", "0")
+FLOAT_MAX = 1.7976931348623157e308
+# самый широкий целый тип БД (для БД, которые не сообщают диапазоны целых полей, например SQLite)
+INTEGER_RANGE = (-(2 ** 63), 2 ** 63 - 1)
+
+IS_VALID_FUNCTION = """
+CREATE OR REPLACE FUNCTION pg_temp.snatch_is_valid(value text, type_name text) RETURNS boolean AS $$
+BEGIN
+    EXECUTE format('SELECT %L::%s', value, type_name);
+    RETURN true;
+EXCEPTION WHEN others THEN
+    RETURN false;
+END
+$$ LANGUAGE plpgsql
+"""
+
+
+class Importer:
+    """Загрузка большого количества записей из потока CSV или NDJSON.
+
+    Поля строк - имена полей модели (для отношений - первичный ключ объекта отношения), как в выгрузке /export.
+    Набор полей задается заголовком CSV или первой строкой NDJSON, незаданные поля заполняются значениями
+    по-умолчанию. Тело запроса читается построчно, поэтому объем памяти не зависит от размера загрузки.
+    При upsert набор полей может не содержать обязательных полей без значения по-умолчанию: тогда строки
+    только изменяют существующие объекты, а строки с новым первичным ключом отклоняются.
+
+    В PostgreSQL строки копируются через COPY FROM STDIN во временную таблицу с текстовыми колонками, затем
+    одним запросом на проверку отбираются строки с неверными типами, длиной, пустыми обязательными
+    значениями, несуществующими объектами отношений и повторами первичного ключа. Типы чисел, логических
+    значений и UUID проверяются регулярными выражениями и диапазонами, остальные типы - одним приведением
+    колонки (только при ошибке приведения значения колонки проверяются по одному). Остальные строки
+    записываются одним INSERT ... SELECT (upsert - с ON CONFLICT по первичному ключу или UPDATE ... FROM).
+    Для остальных БД строки проверяются и записываются порциями по chunk_size через bulk_create/bulk_update.
+
+    Отклоненные строки возвращаются с номером строки, полем и ошибкой (не более max_rejects).
+
+    """
+
+    formats = ("ndjson", "csv")
+    staging_table = "snatch_import"
+    rejects_table = "snatch_import_rejects"
+    read_size = 65536
+
+    def __init__(
+        self,
+        model: type(Model),
+        import_format: str = "ndjson",
+        upsert: bool = False,
+        chunk_size: int = 1000,
+        max_rejects: int = 1000,
+    ):
+        self.model = model
+        self.import_format = import_format
+        self.upsert = upsert
+        self.chunk_size = chunk_size
+        self.max_rejects = max_rejects
+        self.fields = OrderedDict(
+            (field.name, field) for field in model._meta.concrete_fields
+        )
+        self.pk = model._meta.pk
+        self.rejects = list()
+        self.rejected = 0
+        self.missing = list()
+
+    def __call__(self, stream) -> t.Dict:
+        """Загрузка строк
+
+        Args:
+            stream: поток тела запроса
+
+        Returns:
+            количество записанных и отклоненных строк, список отклоненных строк
+        """
+        using = router.db_for_write(self.model)
+        rows = self.iter_rows(stream)
+        with transaction.atomic(using=using):
+            if connections[using].vendor == "postgresql":
+                count = self._copy(connections[using], rows)
+            else:
+                count = self._save(using, rows)
+        if count:
+            table_versions.bump(self.model, using=using)
+        self.rejects.sort(key=lambda reject: reject["line"])
+        return {"count": count, "rejected": self.rejected, "rejects": self.rejects}
+
+    def iter_rows(self, stream) -> t.Iterator[t.Tuple[int, t.Dict[str, t.Optional[str]]]]:
+        """Построчный разбор потока
+
+        Args:
+            stream: поток тела запроса
+
+        Returns:
+            итератор (номер строки, словарь поле -> строковое значение или None)
+        """
+        if self.import_format not in self.formats:
+            raise ImportException(
+                self.model._meta.object_name, f"неизвестный формат {self.import_format}"
+            )
+        lines = _iter_lines(stream, self.read_size)
+        if self.import_format == "csv":
+            yield from self._iter_csv(codecs.iterdecode(lines, "utf-8"))
+        else:
+            yield from self._iter_ndjson(lines)
+
+    def reject(self, line: int, field: t.Optional[str], error: str):
+        """Добавление отклоненной строки
+
+        Args:
+            line: номер строки
+            field: имя поля
+            error: код ошибки
+
+        Returns:
+
+        """
+        self.rejected += 1
+        if len(self.rejects) < self.max_rejects:
+            self.rejects.append({"line": line, "field": field, "error": IMPORT_ERRORS[error]})
+
+    def _iter_csv(self, lines: t.Iterator[str]) -> t.Iterator[t.Tuple[int, t.Dict]]:
+        reader = csv.reader(lines)
+        records = self._iter_records(reader)
+        header = next(records, None)
+        if not header:
+            return
+        unknown = [name for name in header if name not in self.fields]
+        if unknown:
+            raise ImportException(
+                self.model._meta.object_name, f"неизвестные поля {', '.join(unknown)}"
+            )
+        for values in records:
+            if not values:
+                continue
+            if len(values) != len(header):
+                self.reject(reader.line_num, None, "parse")
+                continue
+            invalid = next((name for name, value in zip(header, values) if "\x00" in value), None)
+            if invalid is not None:
+                self.reject(reader.line_num, invalid, "invalid")
+                continue
+            row = dict()
+            for name, value in zip(header, values):
+                field = self.fields[name]
+                if value == "" and (field.null or not isinstance(field, (CharField, TextField))):
+                    if not field.null and field.has_default():
+                        continue
+                    value = None
+                row[name] = value
+            yield reader.line_num, row
+
+    def _iter_records(self, reader) -> t.Iterator[t.List[str]]:
+        while True:
+            try:
+                values = next(reader)
+            except StopIteration:
+                return
+            except UnicodeDecodeError:
+                raise ImportException(
+                    self.model._meta.object_name,
+                    f"строка {reader.line_num + 1}: недопустимая кодировка, ожидается utf-8",
+                )
+            except csv.Error as ex:
+                raise ImportException(
+                    self.model._meta.object_name, f"строка {reader.line_num}: ошибка разбора csv ({ex})"
+                )
+            yield values
+
+    def _iter_ndjson(self, lines: t.Iterator[bytes]) -> t.Iterator[t.Tuple[int, t.Dict]]:
+        names = None
+        for line, data in enumerate(lines, 1):
+            if not data.strip():
+                continue
+            try:
+                item = json.loads(data)
+            except ValueError:
+                self.reject(line, None, "parse")
+                continue
+            if not isinstance(item, dict):
+                self.reject(line, None, "parse")
+                continue
+            if names is None and all(name in self.fields for name in item):
+                names = set(item)
+            unknown = next((name for name in item if name not in self.fields), None)
+            if unknown is not None:
+                self.reject(line, unknown, "unknown")
+                continue
+            extra = next((name for name in item if name not in names), None) if names else None
+            if extra is not None:
+                self.reject(line, extra, "columns")
+                continue
+            row, invalid = dict(), None
+            for name, value in item.items():
+                if isinstance(value, (dict, list)) or (isinstance(value, str) and "\x00" in value):
+                    invalid = name
+                    break
+                if isinstance(value, bool):
+                    value = "true" if value else "false"
+                row[name] = value if value is None else str(value)
+            if invalid is not None:
+                self.reject(line, invalid, "invalid")
+                continue
+            yield line, row
+
+    def _get_columns(self, names: t.Iterable[str]) -> t.List[Field]:
+        """Получение полей, записываемых в таблицу: поля из строк и поля со значением по-умолчанию.
+        Обязательные поля без значения по-умолчанию, отсутствующие в строках, сохраняются в missing
+        (допускаются только при upsert с первичным ключом).
+
+        Args:
+            names: имена полей первой строки
+
+        Returns:
+            список полей
+        """
+        columns = [self.fields[name] for name in names]
+        self.missing = list()
+        for field in self.fields.values():
+            if field in columns or isinstance(field, AutoField):
+                continue
+            if field.has_default():
+                columns.append(field)
+            elif not field.null:
+                self.missing.append(field)
+        if self.missing and not (self.upsert and self.pk.name in names):
+            raise ImportException(
+                self.model._meta.object_name, f"не указано обязательное поле {self.missing[0].name}"
+            )
+        return columns
+
+    def _copy(self, connection, rows: t.Iterator[t.Tuple[int, t.Dict]]) -> int:
+        """Загрузка через временную таблицу и COPY FROM STDIN PostgreSQL
+
+        Args:
+            connection: соединение с БД
+            rows: итератор строк
+
+        Returns:
+            количество записанных строк
+        """
+        first = next(rows, None)
+        if first is None:
+            return 0
+        names = set(first[1])
+        columns = self._get_columns(first[1])
+        quote = connection.ops.quote_name
+        suffix = uuid.uuid4().hex[:12]
+        staging = f"{self.staging_table}_{suffix}"
+        rejects = f"{self.rejects_table}_{suffix}"
+        columns_staging = [f"c{index}" for index in range(len(columns))]
+
+        def get_lines():
+            for line, row in _chain(first, rows):
+                values = [str(line)]
+                for field in columns:
+                    value = row[field.name] if field.name in row else self._get_default(field)
+                    values.append("" if value is None else '"' + value.replace('"', '""') + '"')
+                yield (",".join(values) + "\n").encode()
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TEMP TABLE {staging} (snatch_line bigint, "
+                + ", ".join(f"{name} text" for name in columns_staging)
+                + ") ON COMMIT DROP"
+            )
+            cursor.execute(f"CREATE TEMP TABLE {rejects} (line bigint, field text, error text) ON COMMIT DROP")
+            reader = _LineReader(get_lines())
+            try:
+                with connection.wrap_database_errors:
+                    cursor.copy_expert(f"COPY {staging} FROM STDIN WITH (FORMAT csv)", reader)
+            except DatabaseError:
+                if reader.error is not None:
+                    raise reader.error from None
+                raise
+            cursor.execute(f"ANALYZE {staging}")
+            for condition, params in self._get_checks(cursor, columns, columns_staging, staging, rejects):
+                # OFFSET 0 не дает перенести условия проверки в подзапрос, поэтому значения приводятся
+                # к типам только в строках, прошедших предыдущие проверки
+                cursor.execute(
+                    f"INSERT INTO {rejects} SELECT s.snatch_line, %s, %s FROM (SELECT * FROM {staging} v "
+                    f"WHERE NOT EXISTS (SELECT 1 FROM {rejects} r WHERE r.line = v.snatch_line) OFFSET 0) s "
+                    f"WHERE {condition}",
+                    params,
+                )
+
+            values = {
+                field: f"CAST(s.{name} AS {self._get_type(connection, field)})"
+                for field, name in zip(columns, columns_staging)
+            }
+            updates = [field for field in columns if field.name in names and field is not self.pk]
+            table = quote(self.model._meta.db_table)
+            accepted = f"NOT EXISTS (SELECT 1 FROM {rejects} r WHERE r.line = s.snatch_line)"
+            if self.missing:
+                # строки без обязательных полей только изменяют существующие объекты (новые строки отклонены)
+                count = 0
+                if updates:
+                    cursor.execute(
+                        f"UPDATE {table} t SET "
+                        + ", ".join(f"{quote(field.column)} = {values[field]}" for field in updates)
+                        + f" FROM {staging} s WHERE t.{quote(self.pk.column)} = {values[self.pk]} AND {accepted}"
+                    )
+                    count = cursor.rowcount
+            else:
+                sql = (
+                    f"INSERT INTO {table} ({', '.join(quote(field.column) for field in columns)}) "
+                    f"SELECT {', '.join(values.values())} FROM {staging} s WHERE {accepted} ORDER BY s.snatch_line"
+                )
+                if self.upsert and self.pk in columns:
+                    sql += f" ON CONFLICT ({quote(self.pk.column)}) DO " + (
+                        "UPDATE SET "
+                        + ", ".join(f"{quote(f.column)} = EXCLUDED.{quote(f.column)}" for f in updates)
+                        if updates
+                        else "NOTHING"
+                    )
+                cursor.execute(sql)
+                count = cursor.rowcount
+
+            cursor.execute(f"SELECT count(*) FROM {rejects}")
+            rejected = cursor.fetchone()[0]
+            cursor.execute(
+                f"SELECT line, field, error FROM {rejects} ORDER BY line LIMIT %s",
+                [self.max_rejects - len(self.rejects)],
+            )
+            for line, field, error in cursor.fetchall():
+                self.reject(line, field, error)
+            self.rejected += rejected - cursor.rowcount
+        return count
+
+    def _get_checks(
+        self, cursor, columns: t.List[Field], columns_staging: t.List[str], staging: str, rejects: str
+    ) -> t.Iterator[t.Tuple[str, t.List]]:
+        """Получение условий отбора отклоненных строк временной таблицы s
+
+        Args:
+            cursor: курсор БД
+            columns: записываемые поля
+            columns_staging: колонки временной таблицы
+            staging: имя временной таблицы строк
+            rejects: имя временной таблицы отклоненных строк
+
+        Returns:
+            итератор (условие SQL, параметры: имя поля, код ошибки, параметры условия)
+        """
+        connection = cursor.db
+        quote = connection.ops.quote_name
+        for field, name in zip(columns, columns_staging):
+            if not field.null:
+                yield f"s.{name} IS NULL", [field.name, "required"]
+            if isinstance(field, (CharField, TextField)):
+                if field.max_length:
+                    yield f"length(s.{name}) > %s", [field.name, "too_long", field.max_length]
+                continue
+            condition, params = self._get_type_check(cursor, field, name, staging)
+            if condition:
+                yield f"s.{name} IS NOT NULL AND {condition}", [field.name, "invalid", *params]
+        for field, name in zip(columns, columns_staging):
+            if not field.many_to_one:
+                continue
+            target = field.target_field
+            yield (
+                f"s.{name} IS NOT NULL AND NOT EXISTS (SELECT 1 FROM {quote(target.model._meta.db_table)} t "
+                f"WHERE t.{quote(target.column)} = CAST(s.{name} AS {self._get_type(connection, field)}))",
+                [field.name, "not_found"],
+            )
+        if self.pk not in columns:
+            return
+        name = columns_staging[columns.index(self.pk)]
+        pk_value = f"CAST(s.{name} AS {self._get_type(connection, self.pk)})"
+        yield (
+            f"EXISTS (SELECT 1 FROM {staging} d WHERE d.{name} = s.{name} AND d.snatch_line < s.snatch_line "
+            f"AND NOT EXISTS (SELECT 1 FROM {rejects} r WHERE r.line = d.snatch_line))",
+            [self.pk.name, "duplicate"],
+        )
+        if not self.upsert:
+            yield (
+                f"EXISTS (SELECT 1 FROM {quote(self.model._meta.db_table)} t "
+                f"WHERE t.{quote(self.pk.column)} = {pk_value})",
+                [self.pk.name, "exists"],
+            )
+        elif self.missing:
+            yield (
+                f"NOT EXISTS (SELECT 1 FROM {quote(self.model._meta.db_table)} t "
+                f"WHERE t.{quote(self.pk.column)} = {pk_value})",
+                [self.missing[0].name, "required"],
+            )
+
+    def _get_type_check(self, cursor, field: Field, name: str, staging: str) -> t.Tuple[t.Optional[str], t.List]:
+        """Получение условия неверного значения колонки временной таблицы s для типа поля.
+
+        Целые и дробные числа, логические значения и UUID проверяются регулярными выражениями и диапазонами
+        для всех строк одним условием. Для остальных типов колонка один раз приводится к типу поля в точке
+        сохранения: если приведение успешно, проверка не нужна, иначе значения проверяются по одному.
+
+        Args:
+            cursor: курсор БД
+            field: поле модели
+            name: колонка временной таблицы
+            staging: имя временной таблицы строк
+
+        Returns:
+            условие SQL (None, если все значения верны) и его параметры
+        """
+        connection = cursor.db
+        target = field.target_field if field.is_relation else field
+        internal_type = target.get_internal_type()
+        if internal_type in connection.ops.integer_field_ranges:
+            low, high = connection.ops.integer_field_range(internal_type)
+            return (
+                f"CASE WHEN s.{name} ~ %s THEN CAST(s.{name} AS numeric) NOT BETWEEN %s AND %s ELSE true END",
+                [INTEGER_PATTERN, low, high],
+            )
+        if internal_type == "DecimalField":
+            limit = 10 ** (target.max_digits - target.decimal_places)
+            return (
+                f"CASE WHEN s.{name} ~ %s THEN abs(round(CAST(s.{name} AS numeric), %s)) >= %s ELSE true END",
+                [NUMBER_PATTERN, target.decimal_places, limit],
+            )
+        if internal_type == "FloatField":
+            return (
+                f"CASE WHEN s.{name} ~ %s THEN abs(CAST(s.{name} AS numeric)) > %s "
+                f"ELSE lower(trim(s.{name})) NOT IN ('nan', 'infinity', '+infinity', '-infinity', 'inf', "
+                f"'+inf', '-inf') END",
+                [NUMBER_PATTERN, FLOAT_MAX],
+            )
+        if internal_type in ("BooleanField", "NullBooleanField"):
+            return f"lower(trim(s.{name})) NOT IN %s", [BOOLEAN_VALUES]
+        if internal_type == "UUIDField":
+            return f"s.{name} !~* %s", [UUID_PATTERN]
+        type_name = self._get_type(connection, field)
+        try:
+            with transaction.atomic(using=connection.alias):
+                cursor.execute(f"SELECT count(CAST(s.{name} AS {type_name})) FROM {staging} s")
+            return None, list()
+        except DatabaseError:
+            cursor.execute(IS_VALID_FUNCTION)
+            return f"NOT pg_temp.snatch_is_valid(s.{name}, %s)", [type_name]
+
+    @staticmethod
+    def _get_type(connection, field: Field) -> str:
+        """Получение типа БД для приведения значения поля
+
+        Args:
+            connection: соединение с БД
+            field: поле модели
+
+        Returns:
+            тип БД
+        """
+        if field.is_relation:
+            field = field.target_field
+        return field.cast_db_type(connection)
+
+    @staticmethod
+    def _get_default(field: Field) -> t.Optional[str]:
+        """Получение значения по-умолчанию поля в виде строки
+
+        Args:
+            field: поле модели
+
+        Returns:
+            значение по-умолчанию
+        """
+        if not field.has_default():
+            return None
+        value = field.get_default()
+        if isinstance(value, Model):
+            value = value.pk
+        if value is None:
+            return None
+        if isinstance(value, uuid.UUID):
+            return str(value)
+        if isinstance(value, bool):
+            return "true" if value else "false"
+        return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+    def _save(self, using: str, rows: t.Iterator[t.Tuple[int, t.Dict]]) -> int:
+        """Загрузка порциями через ORM
+
+        Args:
+            using: алиас БД
+            rows: итератор строк
+
+        Returns:
+            количество записанных строк
+        """
+        count, chunk, columns = 0, list(), None
+        for line, row in rows:
+            if columns is None:
+                columns = self._get_columns(row)
+            instance = self._get_instance(line, row)
+            if instance is not None:
+                chunk.append((line, instance, row.keys()))
+            if len(chunk) >= self.chunk_size:
+                count += self._save_chunk(using, chunk)
+                chunk = list()
+        if chunk:
+            count += self._save_chunk(using, chunk)
+        return count
+
+    def _get_instance(self, line: int, row: t.Dict) -> t.Optional[Model]:
+        """Проверка типов значений строки и создание объекта модели
+
+        Args:
+            line: номер строки
+            row: строка
+
+        Returns:
+            объект модели или None, если строка отклонена
+        """
+        values = dict()
+        for name, value in row.items():
+            field = self.fields[name]
+            if value is None:
+                if not field.null:
+                    self.reject(line, name, "required")
+                    return None
+                values[field.attname] = None
+                continue
+            if isinstance(field, (CharField, TextField)) and field.max_length and len(value) > field.max_length:
+                self.reject(line, name, "too_long")
+                return None
+            target = field.target_field if field.is_relation else field
+            try:
+                value = target.to_python(value)
+                target.run_validators(value)
+            except ValidationError:
+                self.reject(line, name, "invalid")
+                return None
+            if isinstance(value, int) and not INTEGER_RANGE[0] <= value <= INTEGER_RANGE[1]:
+                self.reject(line, name, "invalid")
+                return None
+            values[field.attname] = value
+        return self.model(**values)
+
+    def _save_chunk(self, using: str, chunk: t.List[t.Tuple[int, Model, t.Iterable[str]]]) -> int:
+        """Проверка отношений и первичных ключей порции строк и их запись
+
+        Args:
+            using: алиас БД
+            chunk: список (номер строки, объект, имена полей строки)
+
+        Returns:
+            количество записанных строк
+        """
+        rejected = set()
+        for field in self.fields.values():
+            if not field.many_to_one:
+                continue
+            values = {getattr(instance, field.attname) for _, instance, names in chunk if field.name in names}
+            values.discard(None)
+            found = set(
+                field.related_model._default_manager.using(using)
+                .filter(**{f"{field.target_field.attname}__in": values})
+                .values_list(field.target_field.attname, flat=True)
+            )
+            for line, instance, names in chunk:
+                value = getattr(instance, field.attname)
+                if field.name in names and value is not None and value not in found and line not in rejected:
+                    self.reject(line, field.name, "not_found")
+                    rejected.add(line)
+
+        seen = set()
+        for line, instance, names in chunk:
+            if self.pk.name not in names or line in rejected:
+                continue
+            if instance.pk in seen:
+                self.reject(line, self.pk.name, "duplicate")
+                rejected.add(line)
+            seen.add(instance.pk)
+        existing = set(
+            self.model._default_manager.using(using).filter(pk__in=seen).values_list("pk", flat=True)
+        )
+
+        created, updated, fields = list(), list(), set()
+        for line, instance, names in chunk:
+            if line in rejected:
+                continue
+            if self.pk.name in names and instance.pk in existing:
+                if not self.upsert:
+                    self.reject(line, self.pk.name, "exists")
+                    continue
+                updated.append(instance)
+                fields.update(name for name in names if name != self.pk.name)
+            elif self.missing:
+                self.reject(line, self.missing[0].name, "required")
+            else:
+                created.append(instance)
+        manager = self.model._default_manager.db_manager(using)
+        manager.bulk_create(created, batch_size=self.chunk_size)
+        if updated and fields:
+            manager.bulk_update(updated, sorted(fields), batch_size=self.chunk_size)
+        return len(created) + len(updated)
+
+
+class _LineReader:
+    """Файловый объект для COPY FROM STDIN, читающий строки из итератора порциями."""
+
+    def __init__(self, lines: t.Iterator[bytes]):
+        self.lines = lines
+        self.buffer = b""
+        self.error = None
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self.buffer) < size:
+            try:
+                line = next(self.lines, None)
+            except Exception as ex:
+                # psycopg2 заменяет ошибку чтения на QueryCanceled, исходная ошибка сохраняется для вызывающего
+                self.error = ex
+                raise
+            if line is None:
+                break
+            self.buffer += line
+        if size < 0:
+            data, self.buffer = self.buffer, b""
+        else:
+            data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+
+def _chain(first: t.Tuple, rows: t.Iterator[t.Tuple]) -> t.Iterator[t.Tuple]:
+    yield first
+    yield from rows
+
+
+def _iter_lines(stream, size: int) -> t.Iterator[bytes]:
+    """Чтение строк потока порциями по size байт (readline() потока запроса Django копирует
+    непрочитанный остаток тела на каждой строке)"""
+    rest = b""
+    for chunk in iter(lambda: stream.read(size), b""):
+        lines = (rest + chunk).split(b"\n")
+        rest = lines.pop()
+        for line in lines:
+            yield line + b"\n"
+    if rest:
+        yield rest
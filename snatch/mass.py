@@ -0,0 +1,98 @@
+import typing as t
+
+from django.db import router, transaction
+from django.db.models import QuerySet
+from django.db.models.deletion import DO_NOTHING, get_candidate_relations_to_delete
+
+from snatch.exceptions import MassOperationException
+from snatch.versions import table_versions
+
+
+class MassOperation:
+    """Изменение и удаление всех записей, удовлетворяющих фильтру, одним запросом UPDATE/DELETE ... WHERE
+    без загрузки записей в Python.
+
+    Если количество затронутых записей превышает max_rows (0 - без ограничения), операция откатывается.
+    При send_signals = False удаление выполняется одним DELETE без отправки сигналов pre_delete/post_delete,
+    если модель это допускает (нет каскадного удаления на стороне Django и наследования моделей).
+    Иначе используется QuerySet.delete(), который сам выбирает быстрое удаление при отсутствии сигналов
+    и каскадов.
+
+    """
+
+    def __init__(self, queryset: QuerySet, max_rows: int = 1000, send_signals: bool = True):
+        self.queryset = queryset
+        self.max_rows = max_rows
+        self.send_signals = send_signals
+        self.model = queryset.model
+
+    def count(self) -> int:
+        """Количество записей, которые будут затронуты операцией (dry run)
+
+        Returns:
+            количество записей
+        """
+        return self.queryset.count()
+
+    def update(self, values: t.Dict) -> int:
+        """Изменение записей одним UPDATE
+
+        Args:
+            values: новые значения полей
+
+        Returns:
+            количество измененных записей
+        """
+        using = router.db_for_write(self.model)
+        with transaction.atomic(using=using):
+            count = self.queryset.update(**values)
+            self._check_count(count)
+        table_versions.bump(self.model, using=using)
+        return count
+
+    def delete(self) -> int:
+        """Удаление записей одним DELETE (если модель это допускает)
+
+        Returns:
+            количество удаленных записей модели (без учета каскадного удаления)
+        """
+        using = router.db_for_write(self.model)
+        with transaction.atomic(using=using):
+            if not self.send_signals and self.can_raw_delete():
+                count = self.queryset._raw_delete(using)
+                table_versions.bump(self.model, using=using)
+            else:
+                _, deleted = self.queryset.delete()
+                count = deleted.get(self.model._meta.label, 0)
+            self._check_count(count)
+        return count
+
+    def can_raw_delete(self) -> bool:
+        """Проверка возможности удаления одним DELETE без сигналов
+
+        Returns:
+            True, если удаление записей модели не требует каскадов на стороне Django
+        """
+        opts = self.model._meta
+        return (
+            not opts.concrete_model._meta.parents
+            and all(
+                related.field.remote_field.on_delete is DO_NOTHING
+                for related in get_candidate_relations_to_delete(opts)
+            )
+            and not any(
+                hasattr(field, "bulk_related_objects") for field in opts.private_fields
+            )
+        )
+
+    def _check_count(self, count: int):
+        """Проверка количества затронутых записей (исключение откатывает транзакцию)
+
+        Args:
+            count: количество затронутых записей
+
+        Returns:
+
+        """
+        if self.max_rows and count > self.max_rows:
+            raise MassOperationException(self.model._meta.object_name, count, self.max_rows)
@@ -1,24 +1,60 @@
-from collections import OrderedDict
-
-from django.db.models import Manager
-from django.http import HttpResponseRedirect
+import hashlib
+import itertools
+import json
+import logging
+import typing as t
+from collections import OrderedDict, namedtuple
+
+from django.core.exceptions import FieldDoesNotExist
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DatabaseError, IntegrityError
+from django.db.models import Manager, Model
+from django.http import HttpResponseRedirect, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
 from rest_framework import status, mixins
 from rest_framework.exceptions import ValidationError
 from rest_framework.fields import SkipField, empty
-from rest_framework.relations import PKOnlyObject
+from rest_framework.relations import PKOnlyObject, RelatedField
 from rest_framework.response import Response
 from rest_framework.reverse import reverse
+from rest_framework.viewsets import GenericViewSet
 
-from snatch.exceptions import GetObjectException, ModelFilterException
+from snatch.counting import COUNT_MODES
+from snatch.exceptions import ImportException
 from snatch.options.info import SnatchInfo
+from snatch.planner import QueryPlanner
 from snatch.wrappers import add_link_many, add_link_one
 
+logger = logging.getLogger("snatch")
+
+SerializationStep = namedtuple("SerializationStep", ["field_name", "source", "check_pk", "null_relation"])
+
 
 class SnatchCreateModelMixin(mixins.CreateModelMixin):
-    """Создание объекта модели
+    """Создание объекта модели или списка объектов модели
 
     """
-    pass
+    def create(self, request, *args, **kwargs):
+        if not isinstance(request.data, list):
+            return super().create(request, *args, **kwargs)
+        objects = self.get_bulk_writer().create(request.data)
+        return Response(self.get_bulk_data(objects), status=status.HTTP_201_CREATED)
+
+    def import_rows(self, request, *args, **kwargs):
+        try:
+            result = self.get_importer()(request.stream or request._request)
+            return Response(result, status=status.HTTP_200_OK)
+        except ImportException as ex:
+            return Response(data={"detail": str(ex)}, status=status.HTTP_400_BAD_REQUEST)
+        except IntegrityError as ex:
+            error = ImportException(
+                self.queryset.model._meta.object_name, f"нарушено ограничение целостности: {str(ex).strip()}"
+            )
+            return Response(data={"detail": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        except DatabaseError:
+            logger.exception("Ошибка записи в БД при загрузке записей модели %s", self.queryset.model._meta.object_name)
+            error = ImportException(self.queryset.model._meta.object_name, "ошибка записи в БД")
+            return Response(data={"detail": str(error)}, status=status.HTTP_400_BAD_REQUEST)
 
 
 class SnatchRetrieveModelMixin:
@@ -26,64 +62,166 @@ class SnatchRetrieveModelMixin:
 
     """
     def retrieve(self, request, *args, **kwargs):
-        try:
+        with self.get_query_timeout():
+            cache_key = self.get_response_cache_key()
+            cached = self.get_cached_response(cache_key)
+            if cached is not None:
+                return cached
             queryset = self.get_queryset()
-            serializer = self.get_serializer(queryset)
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        except (GetObjectException, ModelFilterException) as ex:
-            return Response(data={"detail": str(ex)}, status=status.HTTP_404_NOT_FOUND)
+            headers = self.get_validators(queryset)
+            not_modified = self.get_not_modified_response(headers)
+            if not_modified is not None:
+                return not_modified
+            data = self.get_serializer(queryset).data
+            self.set_cached_response(cache_key, data, headers)
+            return Response(data, status=status.HTTP_200_OK, headers=headers)
 
 
 class SnatchListModelMixin:
-    """Получение списка объектов и их количества в списке
+    """Получение списка объектов, их количества в списке, агрегированных значений и выгрузка списка
 
     """
     def list(self, request, *args, **kwargs):
-        try:
+        with self.get_query_timeout():
+            cache_key = self.get_response_cache_key()
+            cached = self.get_cached_response(cache_key)
+            if cached is not None:
+                return cached
             queryset = self.get_queryset()
-            serializer = self.get_serializer(queryset, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        except (GetObjectException, ModelFilterException) as ex:
-            return Response(data={"detail": str(ex)}, status=status.HTTP_404_NOT_FOUND)
+            headers = self.get_validators(queryset)
+            not_modified = self.get_not_modified_response(headers)
+            if not_modified is not None:
+                return not_modified
+            if self.is_stream(queryset):
+                return StreamingHttpResponse(
+                    self.iter_with_query_timeout(self.get_stream(queryset)),
+                    content_type="application/json",
+                    headers=headers,
+                )
+            data, count, count_mode = self.get_list_data(queryset)
+            params = self.get_params()
+            if params["cursor"] is not None or params["with_count"]:
+                results = data
+                data = OrderedDict()
+                if params["with_count"]:
+                    data["count"] = count
+                    headers["X-Count-Mode"] = count_mode
+                if params["cursor"] is not None:
+                    data["next"] = self.next_cursor
+                data["results"] = results
+            self.set_cached_response(cache_key, data, headers)
+            return Response(data, status=status.HTTP_200_OK, headers=headers)
 
     def size(self, request, *args, **kwargs):
-        try:
+        count_mode = self.get_params()["count_mode"]
+        if count_mode not in COUNT_MODES:
+            return Response(
+                data={"detail": f"Неизвестный режим подсчета count_mode={count_mode}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        with self.get_query_timeout():
+            cache_key = self.get_response_cache_key()
+            cached = self.get_cached_response(cache_key)
+            if cached is not None:
+                return cached
             queryset = self.get_queryset()
-            count = queryset.count() if queryset else 0
-            return Response(count, status=status.HTTP_200_OK)
-        except (GetObjectException, ModelFilterException) as ex:
-            return Response(data={"detail": str(ex)}, status=status.HTTP_404_NOT_FOUND)
+            count, count_mode = self.get_counter()(queryset, count_mode)
+            headers = {"X-Count-Mode": count_mode}
+            self.set_cached_response(cache_key, count, headers)
+            return Response(count, status=status.HTTP_200_OK, headers=headers)
+
+    def aggregate(self, request, *args, **kwargs):
+        with self.get_query_timeout():
+            cache_key = self.get_response_cache_key()
+            cached = self.get_cached_response(cache_key)
+            if cached is not None:
+                return cached
+            aggregation = self.get_aggregation()
+            queryset = self.get_queryset()
+            params = self.get_params()
+            data = aggregation(queryset, params["offset"], params["limit"])
+            self.set_cached_response(cache_key, data, dict())
+            return Response(data, status=status.HTTP_200_OK)
+
+    def export(self, request, *args, **kwargs):
+        exporter = self.get_exporter()
+        if exporter.export_format not in exporter.formats:
+            return Response(
+                data={"detail": f"Неизвестный формат выгрузки export_format={exporter.export_format}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        with self.get_query_timeout():
+            queryset = self.get_queryset()
+            columns = self.get_export_columns(queryset.model)
+        table_name = queryset.model._meta.db_table.split('"."')[-1]
+        stream = self.iter_with_query_timeout(exporter(queryset, columns))
+        first = next(stream, None)
+        return StreamingHttpResponse(
+            itertools.chain([first] if first is not None else [], stream),
+            content_type=exporter.content_type,
+            headers={
+                "Content-Disposition": f'attachment; filename="{table_name}.{exporter.export_format}"'
+            },
+        )
 
 
 class SnatchUpdateModelMixin:
-    """Обновление объекта модели
+    """Обновление объекта модели или списка объектов модели
 
     """
     def update(self, request, *args, **kwargs):
-        try:
-            instance = self.get_queryset(**kwargs)
-            serializer = self.get_serializer(instance, data=request.data)
-            serializer.is_valid(raise_exception=True)
-            self.perform_update(serializer)
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        except (GetObjectException, ModelFilterException) as ex:
-            return Response(data={"detail": str(ex)}, status=status.HTTP_404_NOT_FOUND)
+        if isinstance(request.data, list):
+            return self.bulk_update(request, *args, **kwargs)
+        instance = self.get_queryset(**kwargs)
+        serializer = self.get_serializer(instance, data=request.data)
+        serializer.is_valid(raise_exception=True)
+        self.perform_update(serializer)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    def bulk_update(self, request, *args, **kwargs):
+        queryset = GenericViewSet.get_queryset(self)
+        objects = self.get_bulk_writer().update(queryset, request.data)
+        return Response(self.get_bulk_data(objects), status=status.HTTP_200_OK)
+
+    def update_many(self, request, *args, **kwargs):
+        if not request.data or not isinstance(request.data, dict):
+            return Response(
+                data={"detail": "Не указаны значения для изменения"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        serializer = self.get_serializer(data=request.data, partial=True)
+        serializer.is_valid(raise_exception=True)
+        operation = self.get_mass_operation()
+        if self.get_params()["dry_run"]:
+            return Response({"count": operation.count()}, status=status.HTTP_200_OK)
+        count = operation.update(serializer.validated_data)
+        return Response({"count": count}, status=status.HTTP_200_OK)
 
     def perform_update(self, serializer):
         serializer.save()
 
 
 class SnatchDestroyModelMixin:
-    """Удаление объекта модели
+    """Удаление объекта модели или списка объектов модели
 
     """
     def destroy(self, request, *args, **kwargs):
-        try:
-            queryset = self.get_queryset()
-            self.perform_destroy(queryset)
-            return Response(status=status.HTTP_204_NO_CONTENT)
-        except (GetObjectException, ModelFilterException) as ex:
-            return Response(data={"detail": str(ex)}, status=status.HTTP_404_NOT_FOUND)
+        if isinstance(request.data, list):
+            return self.bulk_destroy(request, *args, **kwargs)
+        queryset = self.get_queryset()
+        self.perform_destroy(queryset)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def bulk_destroy(self, request, *args, **kwargs):
+        queryset = GenericViewSet.get_queryset(self)
+        self.get_bulk_writer().delete(queryset, request.data)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def destroy_many(self, request, *args, **kwargs):
+        operation = self.get_mass_operation()
+        if self.get_params()["dry_run"]:
+            return Response({"count": operation.count()}, status=status.HTTP_200_OK)
+        return Response({"count": operation.delete()}, status=status.HTTP_200_OK)
 
     def perform_destroy(self, instance):
         instance.delete()
@@ -94,10 +232,29 @@ class SnatchInfoModelMixin:
 
     """
     info_class = SnatchInfo
+    _info_cache = dict()
 
     def info(self, request, *args, **kwargs):
-        data = self.info_class().determine_metadata(self)
-        return Response(data, status=status.HTTP_200_OK)
+        data, etag = self.get_info()
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            not_modified["ETag"] = etag
+            return not_modified
+        return Response(data, status=status.HTTP_200_OK, headers={"ETag": etag})
+
+    def get_info(self) -> t.Tuple[t.Dict, str]:
+        """Получение информации о таблице и ее ETag (вычисляются один раз на процесс)
+
+        Returns:
+            информация о таблице, строгий ETag
+        """
+        key = (type(self), self.info_class)
+        if key not in self._info_cache:
+            data = self.info_class().determine_metadata(self)
+            content = json.dumps(data, sort_keys=True, cls=DjangoJSONEncoder)
+            etag = '"{}"'.format(hashlib.sha1(content.encode()).hexdigest())
+            self._info_cache[key] = (data, etag)
+        return self._info_cache[key]
 
     def info_redirect(self, request, *args, **kwargs):
         field_name = kwargs.get("pk")
@@ -146,14 +303,19 @@ class SnatchDeserializationMixin:
             pk_data = data.get(pk_name)
             if not pk_data:
                 raise ValidationError(detail=f"KeyError, key '{pk_name}' not found.")
-            try:
-                validated_value = model_field.related_model.objects.get(
-                    **{pk_name: pk_data}
-                )
-            except model_field.related_model.DoesNotExist as ex:
-                raise ValidationError(
-                    detail=f"Destination {data} matching query does not exist."
-                )
+            related_objects = self.context.get("related_objects", {})
+            validated_value = related_objects.get(
+                (model_field.related_model, str(pk_data))
+            )
+            if validated_value is None:
+                try:
+                    validated_value = model_field.related_model.objects.get(
+                        **{pk_name: pk_data}
+                    )
+                except model_field.related_model.DoesNotExist as ex:
+                    raise ValidationError(
+                        detail=f"Destination {data} matching query does not exist."
+                    )
         else:
             validated_value = super(SnatchDeserializationMixin, self).run_validation(
                 data
@@ -162,34 +324,108 @@ class SnatchDeserializationMixin:
         return validated_value
 
 
+def load_relations(serializer, instances: t.List[Model], max_level: int):
+    """Пакетная загрузка дочерних объектов сериализатора верхнего уровня, если они не загружены
+    представлением (сериализатор используется вне представления или с объектами без prefetch_related)
+
+    Args:
+        serializer: сериализатор объекта
+        instances: объекты модели
+        max_level: максимальный уровень вложенности
+
+    Returns:
+
+    """
+    planner_class = getattr(serializer.context.get("view"), "query_planner_class", QueryPlanner)
+    planner_class().prefetch(instances, type(serializer), max_level, serializer.context.get("fields"))
+
+
 class SnatchSerializationMixin:
     """Сериализация объекта модели с добавлением self и link.
 
+    Читаемые поля сериализатора компилируются один раз на процесс в неизменяемый план (шаги SerializationStep
+    по ключу класс сериализатора, модель, имена полей), который связывается с полями экземпляра сериализатора
+    при первой сериализации объекта. Цикл по объекту выполняет только шаги плана.
+
     """
+    _plans = dict()
+
     @add_link_one
     def to_representation(self, instance):
         ret = OrderedDict()
-        fields = self._readable_fields
+        fields_tree = self.context.get("fields")
         model = instance._meta.model
-        for field in fields:
+        if self.parent is None and not self.context.get("is_child", False):
+            # max_level уже уменьшен декоратором add_link_one
+            load_relations(self, [instance], self.context["max_level"] + 1)
+        for step, get_attribute, to_representation in self.get_plan(model):
+            if fields_tree and step.field_name not in fields_tree:
+                continue
             try:
-                attribute = field.get_attribute(instance)
+                attribute = get_attribute(instance)
             except SkipField:
                 continue
 
-            check_for_none = (
-                attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
-            )
+            if step.check_pk and isinstance(attribute, PKOnlyObject):
+                check_for_none = attribute.pk
+            else:
+                check_for_none = attribute
             if check_for_none is None:
-                model_field = model._meta.get_field(field.source)
-                ret[field.field_name] = (
-                    {"link": None, "self": None} if model_field.is_relation else None
-                )
+                ret[step.field_name] = {"link": None, "self": None} if step.null_relation else None
+            elif fields_tree is None:
+                ret[step.field_name] = to_representation(attribute)
             else:
-                ret[field.field_name] = field.to_representation(attribute)
+                self.context["fields"] = fields_tree.get(step.field_name) or None
+                try:
+                    ret[step.field_name] = to_representation(attribute)
+                finally:
+                    self.context["fields"] = fields_tree
 
         return ret
 
+    def get_plan(self, model: type(Model)) -> t.Tuple[t.Tuple[SerializationStep, t.Callable, t.Callable], ...]:
+        """Получение плана сериализации объекта модели, связанного с полями сериализатора
+
+        Args:
+            model: модель объекта
+
+        Returns:
+            список (шаг плана, получение атрибута, преобразование значения) в порядке вывода полей
+        """
+        bound = self.__dict__.get("_snatch_plan")
+        if bound is not None and bound[0] is model:
+            return bound[1]
+        fields = list(self._readable_fields)
+        key = (type(self), model, tuple(field.field_name for field in fields))
+        plan = self._plans.get(key)
+        if plan is None:
+            plan = self._plans[key] = tuple(self.compile_step(model, field) for field in fields)
+        steps = tuple(
+            (step, field.get_attribute, field.to_representation) for step, field in zip(plan, fields)
+        )
+        self._snatch_plan = (model, steps)
+        return steps
+
+    @staticmethod
+    def compile_step(model: type(Model), field) -> SerializationStep:
+        """Компиляция шага плана сериализации для поля
+
+        Args:
+            model: модель объекта
+            field: поле сериализатора
+
+        Returns:
+            шаг плана
+        """
+        try:
+            null_relation = model._meta.get_field(field.source).is_relation
+        except FieldDoesNotExist:
+            # source не является полем модели (метод, путь через точку): пустое значение выводится как None
+            null_relation = False
+        return SerializationStep(
+            field.field_name, field.source, isinstance(field, RelatedField), null_relation
+        )
+
 
 class SnatchListSerializerMixin:
     """Сериализация списка объектов модели с добавлением self и link.
@@ -198,6 +434,9 @@ class SnatchListSerializerMixin:
     @add_link_many
     def to_representation(self, data):
         iterable = data.all() if isinstance(data, Manager) else data
+        if self.parent is None and not self.context.get("is_child", False):
+            iterable = list(iterable)
+            load_relations(self.child, iterable, self.context.get("max_level", 1))
 
         return [self.child.to_representation(item) for item in iterable]
 
@@ -0,0 +1,197 @@
+import base64
+import binascii
+import json
+import typing as t
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Model, Q, QuerySet, Value
+
+from snatch.exceptions import CursorError, FilterException
+from snatch.search.lookups import RowCompare
+from snatch.search.paths import field_paths
+
+
+class KeysetPagination:
+    """Постраничный вывод по ключу (курсору) вместо offset/limit.
+
+    Курсор содержит строку сортировки и значения полей сортировки и первичного ключа последней записи
+    страницы. Следующая страница получается сравнением значений строк `(a, b, pk) > (%s, %s, %s)`,
+    которое может использовать составной индекс, поэтому время получения страницы не зависит от ее номера.
+    Если направления сортировки полей различаются или поле сортировки может быть NULL, сравнение раскрывается
+    в эквивалентное условие через OR. Для полей, которые могут быть NULL, порядок NULL задается явно
+    (NULL больше любого значения: NULLS LAST по возрастанию, NULLS FIRST по убыванию) и учитывается в условии
+    через IS NULL/IS NOT NULL.
+
+    """
+
+    annotation_prefix = "snatch_cursor_"
+
+    def __init__(self, model: type(Model), order_: t.Optional[t.List[str]], order_string: t.Optional[str]):
+        self.model = model
+        self.order_string = order_string or ""
+        self.order_ = self._with_pk(list(order_ or []))
+
+    def __call__(
+        self, queryset: QuerySet, cursor: str, limit: int
+    ) -> t.Tuple[t.List[Model], t.Optional[str]]:
+        """Получение страницы записей и курсора следующей страницы
+
+        Args:
+            queryset: отфильтрованное множество записей
+            cursor: курсор (пустая строка для первой страницы)
+            limit: количество записей на странице
+
+        Returns:
+            список записей, курсор следующей страницы (None, если страница последняя)
+        """
+        paths = [key.lstrip("-") for key in self.order_]
+        nullable = [self._is_nullable(path) for path in paths]
+        ordering = [
+            key if not is_nullable
+            else F(path).desc(nulls_first=True) if key.startswith("-")
+            else F(path).asc(nulls_last=True)
+            for key, path, is_nullable in zip(self.order_, paths, nullable)
+        ]
+        queryset = queryset.annotate(
+            **{f"{self.annotation_prefix}{i}": F(path) for i, path in enumerate(paths)}
+        ).order_by(*ordering)
+        if cursor:
+            queryset = queryset.filter(self._get_condition(paths, self.decode(cursor), nullable))
+
+        rows = list(queryset[: limit + 1])
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        values = [
+            getattr(rows[-1], f"{self.annotation_prefix}{i}") for i in range(len(paths))
+        ]
+        return rows, self.encode(values)
+
+    def encode(self, values: t.List[t.Any]) -> str:
+        """Получение курсора по значениям полей сортировки
+
+        Args:
+            values: значения полей сортировки последней записи
+
+        Returns:
+            курсор
+        """
+        data = json.dumps([self.order_string, values], cls=DjangoJSONEncoder)
+        return base64.urlsafe_b64encode(data.encode()).decode()
+
+    def decode(self, cursor: str) -> t.List[t.Any]:
+        """Получение значений полей сортировки из курсора
+
+        Args:
+            cursor: курсор
+
+        Returns:
+            значения полей сортировки
+        """
+        try:
+            order_string, values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (binascii.Error, ValueError, TypeError):
+            raise CursorError(cursor)
+        if order_string != self.order_string or len(values) != len(self.order_):
+            raise CursorError(cursor)
+        return values
+
+    def _with_pk(self, order_: t.List[str]) -> t.List[str]:
+        """Добавление первичного ключа в сортировку для однозначного порядка записей
+
+        Args:
+            order_: список полей сортировки
+
+        Returns:
+            список полей сортировки с первичным ключом
+        """
+        pk_name = self.model._meta.pk.name
+        if not any(key.lstrip("-") in ["pk", pk_name] for key in order_):
+            order_.append("-pk" if order_ and order_[-1].startswith("-") else "pk")
+        return order_
+
+    def _is_nullable(self, path: str) -> bool:
+        """Проверка, может ли значение поля сортировки быть NULL (поле или отношение на пути допускает NULL)
+
+        Args:
+            path: путь поля сортировки
+
+        Returns:
+            True, если значение может быть NULL
+        """
+        attributes = path.split("__")
+        for i in range(1, len(attributes) + 1):
+            try:
+                info = field_paths.resolve(self.model, attributes[:i])
+            except FilterException:
+                return False
+            if info.many or getattr(info.field, "null", False):
+                return True
+        return False
+
+    def _get_condition(
+        self, paths: t.List[str], values: t.List[t.Any], nullable: t.List[bool]
+    ) -> t.Union[Q, RowCompare]:
+        """Получение условия для записей после курсора
+
+        Args:
+            paths: пути полей сортировки
+            values: значения полей сортировки из курсора
+            nullable: признаки полей, значение которых может быть NULL
+
+        Returns:
+            условие фильтрации
+        """
+        try:
+            fields = [field_paths.resolve(self.model, path.split("__")).field for path in paths]
+            values = [
+                None if value is None else field.to_python(value)
+                for field, value in zip(fields, values)
+            ]
+        except (FilterException, ValidationError, ValueError, TypeError):
+            raise CursorError(self.encode(values))
+        if any(value is None for value, is_nullable in zip(values, nullable) if not is_nullable):
+            raise CursorError(self.encode(values))
+
+        descending = [key.startswith("-") for key in self.order_]
+        if len(set(descending)) == 1 and not any(nullable):
+            return RowCompare(
+                [F(path) for path in paths],
+                "<" if descending[0] else ">",
+                [Value(value, output_field=field) for field, value in zip(fields, values)],
+            )
+
+        condition = Q(pk__in=[])
+        for i, path in enumerate(paths):
+            after = self._get_after(path, values[i], descending[i], nullable[i])
+            if after is None:
+                continue
+            condition |= Q(
+                *[
+                    Q(**{f"{paths[j]}__isnull": True}) if values[j] is None else Q(**{paths[j]: values[j]})
+                    for j in range(i)
+                ],
+                after,
+            )
+        return condition
+
+    @staticmethod
+    def _get_after(path: str, value: t.Any, descending: bool, nullable: bool) -> t.Optional[Q]:
+        """Получение условия для значений поля после значения курсора (NULL больше любого значения)
+
+        Args:
+            path: путь поля сортировки
+            value: значение поля из курсора
+            descending: признак сортировки по убыванию
+            nullable: признак поля, значение которого может быть NULL
+
+        Returns:
+            условие или None, если после значения курсора записей нет
+        """
+        if descending:
+            return Q(**{f"{path}__isnull": False}) if value is None else Q(**{f"{path}__lt": value})
+        if value is None:
+            return None
+        after = Q(**{f"{path}__gt": value})
+        return after | Q(**{f"{path}__isnull": True}) if nullable else after
@@ -0,0 +1,323 @@
+import logging
+import threading
+import typing as t
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from django.db.models import Model, Prefetch, QuerySet, prefetch_related_objects
+from rest_framework.serializers import BaseSerializer, ListSerializer
+
+from snatch.exceptions import FilterException, UnknownFieldError
+from snatch.fields import SnatchSerializerMethodField
+from snatch.search.paths import field_paths
+from snatch.search.tuples import PathInfo
+
+logger = logging.getLogger("snatch")
+
+QueryPlan = namedtuple("QueryPlan", ["select_related", "prefetch_related", "only"])
+
+EMPTY_PLAN = QueryPlan(tuple(), tuple(), None)
+
+
+class QueryPlanner:
+    """Построение select_related/prefetch_related по графу сериализатора и уровню вложенности.
+
+    Вложенные сериализаторы прямых отношений (many to one, one to one) попадают в select_related,
+    обратные и множественные отношения (вложенные списки и SnatchSerializerMethodField с указанным
+    serializer_class) - в prefetch_related через Prefetch с собственным планом для дочерней модели.
+    При указании дерева полей (параметр fields) в план попадают только запрошенные отношения, а для каждого
+    множества записей строится список загружаемых полей (only).
+    Уровень плана ограничивается max_level (PLAN_MAX_LEVEL), более глубокие уровни сериализатор загружает
+    по мере обращения. Обратная ссылка дочерних объектов обратного отношения на родителя (Task -> action_list ->
+    task) в план не добавляется: при prefetch_related Django заполняет ее уже загруженным родительским объектом,
+    и новых записей она не дает. Подпланы запоминаются на время построения плана по (класс сериализатора,
+    оставшийся уровень). План без дерева полей строится один раз для пары (класс сериализатора, уровень плана)
+    и хранится в LRU-кэше размером cache_size (PLAN_CACHE_SIZE).
+
+    """
+
+    max_level = settings.SNATCH_FRAMEWORK.get("PLAN_MAX_LEVEL", 5)
+    cache_size = settings.SNATCH_FRAMEWORK.get("PLAN_CACHE_SIZE", 256)
+    _plans = OrderedDict()
+    _lock = threading.Lock()
+
+    def __call__(
+        self,
+        queryset: QuerySet,
+        serializer_class,
+        max_level: int,
+        fields: t.Optional[t.Dict] = None,
+    ) -> QuerySet:
+        """Применение плана к множеству записей
+
+        Args:
+            queryset: множество записей
+            serializer_class: класс сериализатора
+            max_level: максимальный уровень вложенности
+            fields: дерево запрошенных полей (None - все поля)
+
+        Returns:
+            множество записей с select_related, prefetch_related и only
+        """
+        plan = self.get_plan(serializer_class, max_level, fields)
+        if settings.DEBUG:
+            logger.debug(
+                "План запроса %s (max_level=%s): %s",
+                queryset.model._meta.object_name,
+                max_level,
+                self.describe(plan),
+            )
+        return self.apply(queryset, plan)
+
+    def get_plan(
+        self, serializer_class, max_level: int, fields: t.Optional[t.Dict] = None
+    ) -> QueryPlan:
+        """Получение плана для класса сериализатора
+
+        Args:
+            serializer_class: класс сериализатора
+            max_level: максимальный уровень вложенности
+            fields: дерево запрошенных полей (None - все поля)
+
+        Returns:
+            план запроса
+        """
+        if self.max_level is not None:
+            max_level = min(max_level, self.max_level)
+        if fields is not None:
+            return self._walk(serializer_class(), max_level, fields, None, dict())
+        key = (serializer_class, max_level)
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is not None:
+                self._plans.move_to_end(key)
+                return plan
+        plan = self._walk(serializer_class(), max_level, None, None, dict())
+        if self.cache_size:
+            with self._lock:
+                self._plans[key] = plan
+                while len(self._plans) > self.cache_size:
+                    self._plans.popitem(last=False)
+        return plan
+
+    def validate_fields(
+        self, serializer: BaseSerializer, fields: t.Dict, prefix: t.Tuple[str, ...] = tuple()
+    ):
+        """Проверка путей дерева полей по полям сериализатора: имя должно быть читаемым полем сериализатора,
+        а дочерние поля указываются только для вложенных сериализаторов
+
+        Args:
+            serializer: сериализатор
+            fields: дерево запрошенных полей
+            prefix: путь к сериализатору
+
+        Returns:
+
+        """
+        if isinstance(serializer, ListSerializer):
+            serializer = serializer.child
+        readable = {field.field_name: field for field in serializer._readable_fields}
+        for name, sub_fields in fields.items():
+            path = prefix + (name,)
+            field = readable.get(name)
+            if field is None:
+                raise UnknownFieldError(".".join(path))
+            if not sub_fields:
+                continue
+            child = self._get_child(getattr(field, "proxied", field))
+            if not child:
+                raise UnknownFieldError(".".join(path + (next(iter(sub_fields)),)))
+            self.validate_fields(child, sub_fields, path)
+
+    def apply(self, queryset: QuerySet, plan: QueryPlan) -> QuerySet:
+        """Применение плана к множеству записей
+
+        Args:
+            queryset: множество записей
+            plan: план запроса
+
+        Returns:
+            множество записей с select_related, prefetch_related и only
+        """
+        if plan.select_related:
+            queryset = queryset.select_related(*plan.select_related)
+        if plan.prefetch_related:
+            queryset = queryset.prefetch_related(
+                *[
+                    Prefetch(path, queryset=self.apply(model._default_manager.all(), sub_plan))
+                    for path, model, sub_plan in plan.prefetch_related
+                ]
+            )
+        if plan.only is not None:
+            queryset = queryset.only(queryset.model._meta.pk.name, *plan.only)
+        return queryset
+
+    def prefetch(
+        self,
+        instances: t.List[Model],
+        serializer_class,
+        max_level: int,
+        fields: t.Optional[t.Dict] = None,
+    ):
+        """Пакетная загрузка отношений плана (в том числе SnatchSerializerMethodField) для уже загруженных
+        объектов: один запрос IN на отношение и уровень вложенности, дочерние объекты раскладываются по кэшу
+        родительских объектов. Уже загруженные отношения (select_related, prefetch_related) пропускаются.
+
+        Args:
+            instances: объекты модели сериализатора
+            serializer_class: класс сериализатора
+            max_level: максимальный уровень вложенности
+            fields: дерево запрошенных полей (None - все поля)
+
+        Returns:
+
+        """
+        if not instances or not isinstance(instances[0], Model):
+            return
+        plan = self.get_plan(serializer_class, max_level, fields)
+        if plan.select_related or plan.prefetch_related:
+            prefetch_related_objects(
+                instances,
+                *plan.select_related,
+                *[
+                    Prefetch(path, queryset=self.apply(model._default_manager.all(), sub_plan))
+                    for path, model, sub_plan in plan.prefetch_related
+                ],
+            )
+
+    def describe(self, plan: QueryPlan) -> t.Dict:
+        """Текстовое описание плана для журнала
+
+        Args:
+            plan: план запроса
+
+        Returns:
+            описание плана
+        """
+        return {
+            "select_related": list(plan.select_related),
+            "prefetch_related": {
+                path: self.describe(sub_plan) for path, _, sub_plan in plan.prefetch_related
+            },
+            "only": list(plan.only) if plan.only is not None else None,
+        }
+
+    def _walk(
+        self,
+        serializer: BaseSerializer,
+        remaining: int,
+        fields: t.Optional[t.Dict],
+        back_field: t.Optional[str],
+        memo: t.Dict[t.Tuple, QueryPlan],
+    ) -> QueryPlan:
+        """Обход полей сериализатора
+
+        Args:
+            serializer: сериализатор
+            remaining: оставшийся уровень вложенности для данного сериализатора
+            fields: дерево запрошенных полей сериализатора (None - все поля без ограничения загрузки,
+                пустой словарь - все поля сериализатора)
+            back_field: поле модели, ссылающееся на родительский объект обратного отношения
+            memo: подпланы, построенные при обходе
+
+        Returns:
+            план запроса относительно модели сериализатора
+        """
+        if remaining <= 0:
+            # поля сериализатора не выводятся, для ссылки достаточно первичного ключа
+            return EMPTY_PLAN if fields is None else QueryPlan(tuple(), tuple(), tuple())
+        if isinstance(serializer, ListSerializer):
+            serializer = serializer.child
+        key = None
+        if fields is None:
+            key = (type(serializer), remaining, back_field)
+            if key in memo:
+                return memo[key]
+        model = serializer.Meta.model
+
+        select_related, prefetch_related, only = list(), list(), list()
+        is_only = fields is not None
+        for field in serializer._readable_fields:
+            if fields and field.field_name not in fields:
+                continue
+            sub_fields = fields.get(field.field_name, {}) if is_only else None
+            field = getattr(field, "proxied", field)
+            child = self._get_child(field)
+            info = self._resolve(model, field)
+            if info is None:
+                # поле не связано с полем модели, загружаемые поля неизвестны
+                is_only = is_only and child is not False
+                continue
+            if child is False or not info.is_relation:
+                only.append(field.source)
+                continue
+
+            name = field.source
+            if fields is None and name == back_field and info.field.many_to_one:
+                # объект уже загружен как родитель, Django заполняет ссылку при prefetch_related
+                only.append(name)
+                continue
+            sub_back_field = info.field.field.name if info.field.one_to_many else None
+            sub_plan = (
+                self._walk(child, remaining - 1, sub_fields, sub_back_field, memo)
+                if child
+                else EMPTY_PLAN
+            )
+            if info.field.many_to_one or info.field.one_to_one:
+                select_related.append(name)
+                select_related.extend(f"{name}__{path}" for path in sub_plan.select_related)
+                prefetch_related.extend(
+                    (f"{name}__{path}", related_model, related_plan)
+                    for path, related_model, related_plan in sub_plan.prefetch_related
+                )
+                only.append(name)
+                if sub_plan.only is not None:
+                    related_pk = info.related_model._meta.pk.name
+                    only.extend(f"{name}__{path}" for path in (related_pk, *sub_plan.only))
+            else:
+                if sub_plan.only is not None and info.field.one_to_many:
+                    sub_plan = sub_plan._replace(
+                        only=(*sub_plan.only, info.field.field.name)
+                    )
+                prefetch_related.append((name, info.related_model, sub_plan))
+
+        plan = QueryPlan(
+            tuple(select_related), tuple(prefetch_related), tuple(only) if is_only else None
+        )
+        if key is not None:
+            memo[key] = plan
+        return plan
+
+    def _resolve(self, model, field) -> t.Optional[PathInfo]:
+        """Получение информации о поле модели, соответствующем полю сериализатора
+
+        Args:
+            model: модель сериализатора
+            field: поле сериализатора
+
+        Returns:
+            информация о поле модели или None, если поле сериализатора не связано с полем модели
+        """
+        if not field.source or "." in field.source or field.source == "*":
+            return None
+        try:
+            return field_paths.resolve(model, [field.source])
+        except FilterException:
+            return None
+
+    def _get_child(self, field) -> t.Union[BaseSerializer, None, bool]:
+        """Получение сериализатора дочерних объектов поля
+
+        Args:
+            field: поле сериализатора
+
+        Returns:
+            сериализатор, None (отношение без сериализатора) или False (поле не является отношением)
+        """
+        if isinstance(field, BaseSerializer):
+            return field
+        if isinstance(field, SnatchSerializerMethodField):
+            serializer_class = field.get_serializer_class()
+            return serializer_class() if serializer_class else None
+        return False
+
@@ -0,0 +1,122 @@
+import threading
+import time
+import typing as t
+
+from django.core.cache import caches
+from django.db import DatabaseError, connections
+
+
+class ReplicaSelector:
+    """Выбор реплики БД для действий на чтение.
+
+    Стратегии выбора:
+        - round_robin - реплики по очереди
+        - least_lagged - реплика с наименьшим отставанием от основной БД
+
+    Доступность и отставание реплик проверяются при любой стратегии не чаще раза в lag_ttl секунд на процесс:
+    для PostgreSQL запрашивается now() - pg_last_xact_replay_timestamp() (сек.), для остальных БД выполняется
+    SELECT 0 (отставание считается нулевым). Реплики с отставанием больше max_lag (None - без ограничения)
+    и недоступные реплики не используются. Если подходящих реплик нет, запрос
+    выполняется в основной БД. После изменения записей клиент закрепляется за основной БД на sticky секунд
+    (0 - без закрепления), отметка хранится в кэше Django и действует для всех процессов.
+
+    """
+
+    key_prefix = "snatch:sticky:"
+    lag_sql = "SELECT COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)"
+    _counters = dict()
+    _lags = dict()
+    _lock = threading.Lock()
+
+    def __init__(
+        self,
+        aliases: t.Sequence[str],
+        strategy: str = "round_robin",
+        max_lag: t.Optional[float] = None,
+        sticky: int = 0,
+        lag_ttl: float = 1.0,
+        cache_alias: str = "default",
+    ):
+        self.aliases = tuple(aliases)
+        self.strategy = strategy
+        self.max_lag = max_lag
+        self.sticky = sticky
+        self.lag_ttl = lag_ttl
+        self.cache_alias = cache_alias
+
+    def __call__(self, primary: str, client: t.Optional[str] = None) -> str:
+        """Выбор БД для чтения
+
+        Args:
+            primary: алиас основной БД
+            client: идентификатор клиента для закрепления за основной БД
+
+        Returns:
+            алиас БД
+        """
+        if not self.aliases or self.is_pinned(client):
+            return primary
+        lags = {alias: self.get_lag(alias) for alias in self.aliases}
+        aliases = tuple(
+            alias
+            for alias in self.aliases
+            if lags[alias] is not None and (self.max_lag is None or lags[alias] <= self.max_lag)
+        )
+        if not aliases:
+            return primary
+        if self.strategy == "least_lagged":
+            return min(aliases, key=lambda alias: lags[alias])
+        with self._lock:
+            index = self._counters.get(self.aliases, 0)
+            self._counters[self.aliases] = index + 1
+        return aliases[index % len(aliases)]
+
+    def get_lag(self, alias: str) -> t.Optional[float]:
+        """Получение отставания реплики
+
+        Args:
+            alias: алиас реплики
+
+        Returns:
+            отставание (сек.) или None, если реплика недоступна
+        """
+        now = time.monotonic()
+        cached = self._lags.get(alias)
+        if cached is not None and now - cached[0] < self.lag_ttl:
+            return cached[1]
+        connection = connections[alias]
+        sql = self.lag_sql if connection.vendor == "postgresql" else "SELECT 0"
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(sql)
+                lag = float(cursor.fetchone()[0])
+        except DatabaseError:
+            lag = None
+        with self._lock:
+            self._lags[alias] = (now, lag)
+        return lag
+
+    def pin(self, client: t.Optional[str]):
+        """Закрепление клиента за основной БД после изменения записей
+
+        Args:
+            client: идентификатор клиента
+
+        Returns:
+
+        """
+        if self.sticky and client is not None:
+            caches[self.cache_alias].set(f"{self.key_prefix}{client}", True, self.sticky)
+
+    def is_pinned(self, client: t.Optional[str]) -> bool:
+        """Проверка закрепления клиента за основной БД
+
+        Args:
+            client: идентификатор клиента
+
+        Returns:
+            True, если клиент недавно изменял записи
+        """
+        if not self.sticky or client is None:
+            return False
+        return bool(caches[self.cache_alias].get(f"{self.key_prefix}{client}"))
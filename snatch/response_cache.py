@@ -0,0 +1,86 @@
+import hashlib
+import json
+import typing as t
+
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Model
+
+from snatch.versions import table_versions
+
+
+class ResponseCache:
+    """Кэш ответов эндпойнтов чтения (/list, /, /size) на основе кэша Django.
+
+    Ключ записи строится по таблице, действию, нормализованным параметрам запроса, области прав пользователя
+    и версиям таблиц, от которых зависит ответ: таблиц графа сериализатора с учетом max_level и таблиц
+    отношений из параметров фильтрации и сортировки. Фиксация транзакции, изменившей записи любой из этих таблиц,
+    меняет ее версию (snatch.versions.TableVersions), поэтому записи кэша с прежними данными больше не используются
+    и удаляются по истечении timeout. Версии должны храниться в общем для всех процессов кэше, иначе процесс
+    с устаревшей версией отдает прежний ответ до истечения timeout.
+
+    """
+
+    key_prefix = "snatch:response:"
+
+    def __init__(self, cache_alias: str = "default", timeout: int = 60):
+        self.cache = caches[cache_alias]
+        self.timeout = timeout
+
+    def make_key(
+        self,
+        model: type(Model),
+        action: str,
+        params: t.List[t.Tuple[str, str]],
+        scope: str,
+        models: t.Iterable[type(Model)],
+    ) -> str:
+        """Получение ключа записи кэша
+
+        Args:
+            model: модель представления
+            action: действие представления
+            params: нормализованные параметры запроса
+            scope: область прав пользователя
+            models: модели, от которых зависит ответ
+
+        Returns:
+            ключ кэша
+        """
+        models = sorted(set(models), key=lambda item: item._meta.label)
+        content = json.dumps(
+            [
+                model._meta.db_table,
+                action,
+                params,
+                scope,
+                [item._meta.db_table for item in models],
+                table_versions.get_many(models),
+            ],
+            cls=DjangoJSONEncoder,
+        )
+        return f"{self.key_prefix}{hashlib.sha1(content.encode()).hexdigest()}"
+
+    def get(self, key: str) -> t.Optional[t.Tuple[t.Any, t.Dict[str, str]]]:
+        """Получение данных ответа и его заголовков из кэша
+
+        Args:
+            key: ключ кэша
+
+        Returns:
+            данные и заголовки ответа или None, если записи нет в кэше
+        """
+        return self.cache.get(key)
+
+    def set(self, key: str, data: t.Any, headers: t.Dict[str, str]):
+        """Сохранение данных ответа и его заголовков в кэш
+
+        Args:
+            key: ключ кэша
+            data: данные ответа
+            headers: заголовки ответа
+
+        Returns:
+
+        """
+        self.cache.set(key, (data, headers), self.timeout)
@@ -1,8 +1,11 @@
 from collections import namedtuple
 
+from django.urls import re_path
 from rest_framework.routers import SimpleRouter
 from rest_framework.settings import api_settings
 
+from snatch.batch import SnatchBatchView
+
 Route = namedtuple("Route", ["url", "mapping", "name", "detail", "initkwargs"])
 
 
@@ -10,8 +13,16 @@ class SnatchRouter(SimpleRouter):
     """Snatch роутер для получения эндпойнтов в следующей нотации:
         - table_schema/table_name/list
             - GET - получение списка объектов
+            - PATCH - изменение всех объектов, удовлетворяющих фильтру
+            - DELETE - удаление всех объектов, удовлетворяющих фильтру
         - table_schema/table_name/size
             - GET - получение количества объектов в списке
+        - table_schema/table_name/aggregate
+            - GET - получение агрегированных значений списка объектов
+        - table_schema/table_name/export
+            - GET - потоковая выгрузка списка объектов в NDJSON или CSV
+        - table_schema/table_name/import
+            - POST - потоковая загрузка объектов из NDJSON или CSV
         - table_schema/table_name/
             - GET - получение объекта
             - POST - создание объекта
@@ -21,12 +32,16 @@ class SnatchRouter(SimpleRouter):
             - GET - получение информации о таблице
         - table_schema/table_name/info/table_attribute
             - GET - редирект на список элементов из родительской таблицы (если поля является ссылкой)
+        - batch
+            - POST - пакетное выполнение запросов к эндпойнтам роутера (если batch = True)
 
     """
+    batch_view_class = SnatchBatchView
+
     routes = [
         Route(
             url=r"^{prefix}/list$",
-            mapping={"get": "list"},
+            mapping={"get": "list", "patch": "update_many", "delete": "destroy_many"},
             name="{basename}_list",
             detail=False,
             initkwargs={"suffix": "List"},
@@ -38,6 +53,27 @@ class SnatchRouter(SimpleRouter):
             detail=False,
             initkwargs={"suffix": "Size"},
         ),
+        Route(
+            url=r"^{prefix}/aggregate$",
+            mapping={"get": "aggregate"},
+            name="{basename}_aggregate",
+            detail=False,
+            initkwargs={"suffix": "Aggregate"},
+        ),
+        Route(
+            url=r"^{prefix}/export$",
+            mapping={"get": "export"},
+            name="{basename}_export",
+            detail=False,
+            initkwargs={"suffix": "Export"},
+        ),
+        Route(
+            url=r"^{prefix}/import$",
+            mapping={"post": "import_rows"},
+            name="{basename}_import",
+            detail=False,
+            initkwargs={"suffix": "Import"},
+        ),
         Route(
             url=r"^{prefix}/$",
             mapping={
@@ -71,8 +107,22 @@ class SnatchRouter(SimpleRouter):
             self.root_renderers = kwargs.pop("root_renderers")
         else:
             self.root_renderers = list(api_settings.DEFAULT_RENDERER_CLASSES)
+        self.batch = kwargs.pop("batch", True)
         super().__init__(*args, **kwargs)
 
+    def get_urls(self):
+        """Получение списка эндпойнтов зарегистрированных представлений и эндпойнта пакетных запросов
+
+        Returns:
+            список эндпойнтов
+        """
+        urls = super().get_urls()
+        if self.batch:
+            urls.append(
+                re_path(r"^batch$", self.batch_view_class.as_view(router=self), name="snatch_batch")
+            )
+        return urls
+
     def register_all(self, views):
         """Инициация всех эндпойнтов по списку представлений
 
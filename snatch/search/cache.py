@@ -0,0 +1,128 @@
+import copy
+import threading
+import typing as t
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Model, Q
+
+
+class CompiledFilterCache:
+    """LRU-кэш скомпилированных параметров фильтрации и сортировки.
+
+    Ключом является модель, признак фильтрации и нормализованная строка запроса.
+    Из кэша всегда возвращается копия значения, поэтому закэшированный Q не может быть изменен.
+    Размер кэша задается параметром FILTER_CACHE_SIZE в SNATCH_FRAMEWORK (0 - кэш отключен).
+
+    """
+
+    default_max_size = 256
+
+    def __init__(self, max_size: t.Optional[int] = None):
+        self._max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def max_size(self) -> int:
+        """Максимальное количество записей в кэше
+
+        Returns:
+            размер кэша
+        """
+        if self._max_size is None:
+            self._max_size = int(
+                settings.SNATCH_FRAMEWORK.get(
+                    "FILTER_CACHE_SIZE", self.default_max_size
+                )
+            )
+        return self._max_size
+
+    @staticmethod
+    def make_key(model: type(Model), input_string: str, is_filter: bool) -> t.Tuple:
+        """Получение ключа кэша
+
+        Args:
+            model: модель, для которой строится запрос
+            input_string: строка запроса
+            is_filter: признак фильтрации (иначе сортировка)
+
+        Returns:
+            ключ кэша
+        """
+        return model, bool(is_filter), input_string.strip()
+
+    def get(self, key: t.Tuple) -> t.Optional[t.Union[Q, t.List[str]]]:
+        """Получение копии значения из кэша
+
+        Args:
+            key: ключ кэша
+
+        Returns:
+            копия значения или None, если значения нет в кэше
+        """
+        if not self.max_size:
+            return None
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+        return self._copy(value)
+
+    def set(self, key: t.Tuple, value: t.Union[Q, t.List[str]]):
+        """Добавление значения в кэш с вытеснением самых старых записей
+
+        Args:
+            key: ключ кэша
+            value: скомпилированный запрос
+
+        Returns:
+
+        """
+        if not self.max_size or value is None:
+            return
+        value = self._copy(value)
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Очистка кэша и счетчиков
+
+        Returns:
+
+        """
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> t.Dict[str, int]:
+        """Получение статистики использования кэша
+
+        Returns:
+            словарь со счетчиками попаданий, промахов и вытеснений
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._data),
+                "max_size": self.max_size,
+            }
+
+    @staticmethod
+    def _copy(value: t.Union[Q, t.List[str]]) -> t.Union[Q, t.List[str]]:
+        return copy.deepcopy(value) if isinstance(value, Q) else list(value)
+
+
+filter_cache = CompiledFilterCache()
@@ -0,0 +1,200 @@
+import math
+import sys
+import typing as t
+
+from django.conf import settings
+from django.db.models import Model, Q, QuerySet
+
+from snatch.exceptions import QueryCostException
+from snatch.search.query_parser import QueryParser
+from snatch.search.tuples import GroupNode, ConditionNode, PathInfo
+from snatch.search.validators import validate_attributes
+from snatch.utils import explain_plan
+
+DEFAULT_QUERY_COST = {
+    # максимальная стоимость запроса (None - проверка стоимости отключена)
+    "MAX_COST": None,
+    # ограничения параметров запроса (None - без ограничения)
+    "MAX_LIMIT": None,
+    "MAX_LEVEL": None,
+    "MAX_DEPTH": None,
+    # проверка стоимости по плану запроса PostgreSQL (EXPLAIN)
+    "USE_EXPLAIN": False,
+    "MAX_EXPLAIN_COST": None,
+    "WEIGHTS": {
+        "CONDITION": 1,
+        "JOIN": 10,
+        "MANY_JOIN": 50,
+        "WILDCARD": 100,
+        "LIST_ITEM": 1,
+        "OR_GROUP": 20,
+        "ORDER": 5,
+        "ROW": 0.1,
+        "LEVEL_FAN_OUT": 5,
+    },
+}
+
+WILDCARD_OPERATORS = ("contains", "endswith")
+
+
+class QueryCostGuard:
+    """Оценка стоимости запроса до его выполнения в БД.
+
+    Стоимость складывается из количества условий и соединений (join) в фильтре и сортировке,
+    множественных отношений на пути (fan-out), поиска по шаблону с ведущим '*', размеров списков значений,
+    групп or и оценочного количества строк (limit с учетом max_level). Параметры задаются в
+    SNATCH_FRAMEWORK["QUERY_COST"] и могут быть переопределены в представлении через атрибут query_cost.
+
+    """
+
+    def __init__(self, config: t.Optional[t.Dict] = None):
+        self.config = self._merge(
+            DEFAULT_QUERY_COST, settings.SNATCH_FRAMEWORK.get("QUERY_COST", {}), config or {}
+        )
+        self.weights = self.config["WEIGHTS"]
+
+    @property
+    def is_enabled(self) -> bool:
+        """Признак включенной проверки стоимости
+
+        Returns:
+            True, если задано хотя бы одно ограничение
+        """
+        keys = ["MAX_COST", "MAX_LIMIT", "MAX_LEVEL", "MAX_DEPTH"]
+        return any(self.config[key] is not None for key in keys) or bool(
+            self.config["USE_EXPLAIN"] and self.config["MAX_EXPLAIN_COST"] is not None
+        )
+
+    def __call__(
+        self, params: t.Dict, queryset: QuerySet, filter_: t.Optional[Q]
+    ) -> t.Optional[t.Dict[str, float]]:
+        """Проверка стоимости запроса
+
+        Args:
+            params: параметры запроса
+            queryset: исходное множество записей
+            filter_: преобразованные параметры фильтрации
+
+        Returns:
+            составляющие стоимости запроса или None, если проверка отключена
+        """
+        if not self.is_enabled:
+            return None
+        model = queryset.model
+        self._check_limits(params, model)
+        cost = self.estimate(params, model)
+        max_cost = self.config["MAX_COST"]
+        if max_cost is not None and cost["total"] > max_cost:
+            raise QueryCostException(
+                model._meta.object_name,
+                f"стоимость запроса {cost['total']:g} превышает допустимую {max_cost:g}",
+                cost,
+            )
+        if self.config["USE_EXPLAIN"]:
+            self._check_explain(params, queryset, filter_)
+        return cost
+
+    def estimate(self, params: t.Dict, model: type(Model)) -> t.Dict[str, float]:
+        """Оценка стоимости запроса по параметрам фильтрации, сортировки и пагинации
+
+        Args:
+            params: параметры запроса
+            model: модель
+
+        Returns:
+            составляющие стоимости запроса
+        """
+        cost = dict.fromkeys(
+            ["conditions", "joins", "fan_out", "wildcards", "lists", "or_groups", "order", "rows"], 0
+        )
+        if params.get("query"):
+            self._estimate_filter(QueryParser()(params["query"]), model, cost)
+        if params.get("order") and params.get("many"):
+            for node in QueryParser()(params["order"], is_filter=False).children:
+                info = validate_attributes(list(node.attributes), model)
+                cost["order"] += self.weights["ORDER"]
+                self._estimate_path(info, cost)
+
+        rows = params.get("limit", 1) if params.get("many") else 1
+        try:
+            rows_cost = (
+                rows
+                * self.weights["ROW"]
+                * float(self.weights["LEVEL_FAN_OUT"]) ** max(params.get("max_level", 1) - 1, 0)
+            )
+        except OverflowError:
+            rows_cost = math.inf
+        # стоимость строк ограничивается, чтобы оставаться конечным числом в ответе с ошибкой
+        max_cost = self.config["MAX_COST"]
+        cost["rows"] = min(rows_cost, max_cost + 1 if max_cost is not None else sys.float_info.max)
+        cost["total"] = sum(cost.values())
+        return cost
+
+    def _estimate_filter(self, tree: GroupNode, model: type(Model), cost: t.Dict):
+        depth = self.config["MAX_DEPTH"]
+        stack = [(tree, 0)]
+        while stack:
+            node, level = stack.pop()
+            if depth is not None and level > depth:
+                raise QueryCostException(
+                    model._meta.object_name,
+                    f"глубина вложенности групп превышает допустимую {depth}",
+                )
+            if node.operator == "or":
+                cost["or_groups"] += self.weights["OR_GROUP"]
+            for child in node.children:
+                if isinstance(child, GroupNode):
+                    stack.append((child, level + 1))
+                else:
+                    self._estimate_condition(child, model, cost)
+
+    def _estimate_condition(self, node: ConditionNode, model: type(Model), cost: t.Dict):
+        info = validate_attributes(list(node.attributes), model)
+        cost["conditions"] += self.weights["CONDITION"]
+        self._estimate_path(info, cost)
+        if isinstance(node.value, list):
+            cost["lists"] += len(node.value) * self.weights["LIST_ITEM"]
+        elif node.operator == "like" and node.value.startswith("*"):
+            cost["wildcards"] += self.weights["WILDCARD"]
+
+    def _estimate_path(self, info: t.Optional[PathInfo], cost: t.Dict):
+        if info is None:
+            return
+        cost["joins"] += len(info.joins) * self.weights["JOIN"]
+        if info.many:
+            cost["fan_out"] += self.weights["MANY_JOIN"]
+
+    def _check_limits(self, params: t.Dict, model: type(Model)):
+        for key, config_key in [("limit", "MAX_LIMIT"), ("max_level", "MAX_LEVEL")]:
+            max_value = self.config[config_key]
+            if max_value is not None and params.get(key, 0) > max_value:
+                raise QueryCostException(
+                    model._meta.object_name,
+                    f"параметр '{key}' не может быть больше {max_value}",
+                )
+
+    def _check_explain(self, params: t.Dict, queryset: QuerySet, filter_: t.Optional[Q]):
+        max_cost = self.config["MAX_EXPLAIN_COST"]
+        if max_cost is None:
+            return
+        if filter_:
+            queryset = queryset.filter(filter_)
+        if params.get("many"):
+            queryset = queryset[params["offset"] : params["offset"] + params["limit"]]
+        plan = explain_plan(queryset)
+        if plan and plan["Total Cost"] > max_cost:
+            raise QueryCostException(
+                queryset.model._meta.object_name,
+                f"оценка стоимости плана запроса {plan['Total Cost']:g} превышает допустимую {max_cost:g}",
+                {"explain": plan["Total Cost"]},
+            )
+
+    @classmethod
+    def _merge(cls, *configs: t.Dict) -> t.Dict:
+        result = dict()
+        for config in configs:
+            for key, value in config.items():
+                if isinstance(value, dict):
+                    value = cls._merge(result.get(key, {}), value)
+                result[key] = value
+        return result
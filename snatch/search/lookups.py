@@ -0,0 +1,102 @@
+import typing as t
+
+from django.db.models import (
+    BooleanField,
+    CharField,
+    DateField,
+    DecimalField,
+    Expression,
+    Field,
+    FloatField,
+    ForeignKey,
+    IntegerField,
+    Lookup,
+    TextField,
+    TimeField,
+    UUIDField,
+)
+from django.db.models.lookups import In
+
+
+class AnyLookup(Lookup):
+    """Поиск по списку значений через `= ANY(%s)` с одним параметром-массивом.
+
+    В отличие от IN с отдельным параметром на каждое значение PostgreSQL получает одно значение привязки
+    и одну форму плана независимо от длины списка. Для остальных БД используется IN.
+    Регистрируется только для полей ANY_LOOKUP_FIELDS, оператор in заменяется на any в coerce_value.
+
+    """
+
+    lookup_name = "any"
+
+    def get_prep_lookup(self):
+        prep_value = self.lhs.output_field.get_prep_value
+        return [prep_value(value) for value in self.rhs]
+
+    def get_db_prep_lookup(self, value, connection):
+        db_prep_value = self.lhs.output_field.get_db_prep_value
+        return "%s", [[db_prep_value(item, connection, prepared=True) for item in value]]
+
+    def as_sql(self, compiler, connection):
+        return In(self.lhs, self.rhs).as_sql(compiler, connection)
+
+    def as_postgresql(self, compiler, connection):
+        lhs_sql, lhs_params = self.process_lhs(compiler, connection)
+        rhs_sql, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs_sql} = ANY({rhs_sql})", lhs_params + rhs_params
+
+
+ANY_LOOKUP_FIELDS = (
+    IntegerField,
+    DecimalField,
+    FloatField,
+    CharField,
+    TextField,
+    UUIDField,
+    DateField,
+    TimeField,
+    ForeignKey,
+)
+
+for field_class in ANY_LOOKUP_FIELDS:
+    field_class.register_lookup(AnyLookup)
+
+
+def supports_any(field: Field) -> bool:
+    """Признак поля, для которого зарегистрирован оператор any
+
+    Args:
+        field: поле модели (обратные отношения не поддерживаются)
+
+    Returns:
+        True, если список значений можно передать одним параметром-массивом
+    """
+    return isinstance(field, ANY_LOOKUP_FIELDS)
+
+
+class RowCompare(Expression):
+    """Сравнение значений строк вида `(a, b, c) > (%s, %s, %s)`, которое может использовать составной индекс.
+
+    """
+
+    conditional = True
+
+    def __init__(self, lhs: t.List, operator: str, rhs: t.List):
+        super().__init__(output_field=BooleanField())
+        self.lhs, self.operator, self.rhs = list(lhs), operator, list(rhs)
+
+    def get_source_expressions(self):
+        return [*self.lhs, *self.rhs]
+
+    def set_source_expressions(self, exprs):
+        self.lhs, self.rhs = exprs[: len(self.lhs)], exprs[len(self.lhs) :]
+
+    def as_sql(self, compiler, connection):
+        lhs = [compiler.compile(expression) for expression in self.lhs]
+        rhs = [compiler.compile(expression) for expression in self.rhs]
+        sql = "({}) {} ({})".format(
+            ", ".join(sql for sql, _ in lhs),
+            self.operator,
+            ", ".join(sql for sql, _ in rhs),
+        )
+        return sql, [param for _, params in lhs + rhs for param in params]
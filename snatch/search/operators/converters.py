@@ -1,5 +1,7 @@
 import re
 
+from snatch.exceptions import NotValidValueError
+
 
 def eq_convert(value):
     if value == "null":
@@ -44,8 +46,9 @@ def like_convert(value):
 
 def is_convert(value):
     ntf = {"true": ["", True], "false": ["", False], "null": ["isnull", True]}
-    if value in ntf.keys():
-        operator, value = ntf[value]
+    if value not in ntf.keys():
+        raise NotValidValueError("is", value)
+    operator, value = ntf[value]
     return operator, value, False
 
 
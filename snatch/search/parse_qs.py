@@ -3,13 +3,15 @@ import typing as t
 
 from django.db.models import Q, Model
 
+from snatch.search.cache import filter_cache
 from snatch.search.operators.consts import DEFAULT_OPERATORS
 from snatch.search.validators import (
     validate_brackets,
     validate_attributes,
     convert_operator,
 )
-from snatch.search.tuples import BracketParser
+from snatch.search.query_parser import QueryParser
+from snatch.search.tuples import BracketParser, GroupNode, ConditionNode
 
 
 class StrongCreator:
@@ -20,73 +22,115 @@ class StrongCreator:
     def __call__(
         self, input_sting: str, model: type(Model), is_filter=True
     ) -> t.Union[Q, t.List[str]]:
-        parse_data = StrongParser()(input_sting, model, is_filter=is_filter)
+        key = filter_cache.make_key(model, input_sting, is_filter)
+        result = filter_cache.get(key)
+        if result is not None:
+            return result
+        tree = QueryParser()(input_sting, is_filter=is_filter)
         if is_filter:
-            return self._to_Q_filter(parse_data, model)
-        return self._to_Q_order(parse_data, model)
-
-    def _to_Q_filter(
-        self, data: t.List[t.Dict[str, t.Any]], model: type(Model), main_key=None
-    ) -> Q:
-        query = Q()
-        for line in data:
-            key_list = list(line.keys())
-            for key in key_list:
-                if key in ["and", "not"]:
-                    query &= self._to_Q_filter(line[key], model, main_key=key)
-                elif key in ["or"]:
-                    query |= self._to_Q_filter(line[key], model, main_key=key)
-                else:
-                    item = line.pop(key)
-                    attribute_list = key.split("__")[:-1]
-                    operator = key.split("__")[-1]
-                    validate_attributes(attribute_list, model)
-                    operator, item, is_not = convert_operator(operator, item)
-                    new_key = "{}{}".format(
-                        "__".join(attribute_list), f"__{operator}" if operator else ""
-                    )
-                    if is_not:
-                        query &= ~Q(**{new_key: item})
-                    else:
-                        line.update({new_key: item})
-
-        if main_key:
-            func = getattr(self, f"_{main_key}_convert", None)
-            query = func(query, data) if func else query
-        if not query:
-            query = self._and_convert(query, data)
-        return query
+            result = self._to_Q_filter(tree, model)
+        else:
+            result = self._to_Q_order(tree, model)
+        filter_cache.set(key, result)
+        return result
+
+    def _to_Q_filter(self, tree: GroupNode, model: type(Model)) -> Q:
+        """Преобразование дерева фильтрации в Q (обход в обратном порядке без рекурсии)
+
+        Args:
+            tree: корневой узел дерева
+            model: модель, для которой строится запрос
+
+        Returns:
+            запрос через Q
+        """
+        compiled = dict()
+        stack = [(tree, False)]
+        while stack:
+            node, is_visited = stack.pop()
+            if not is_visited:
+                stack.append((node, True))
+                stack.extend(
+                    (child, False)
+                    for child in node.children
+                    if isinstance(child, GroupNode)
+                )
+                continue
+            children = [
+                compiled.pop(id(child))
+                if isinstance(child, GroupNode)
+                else self._to_Q_condition(child, model)
+                for child in node.children
+            ]
+            func = getattr(self, f"_{node.operator}_convert")
+            compiled[id(node)] = func(children)
+        return compiled[id(tree)]
+
+    def _to_Q_condition(
+        self, node: ConditionNode, model: type(Model)
+    ) -> t.Tuple[str, t.Any, bool]:
+        """Преобразование условия фильтрации в нотацию Django
+
+        Args:
+            node: узел условия
+            model: модель, для которой строится запрос
+
+        Returns:
+            ключ запроса, значение, признак отрицания
+        """
+        attribute_list = list(node.attributes)
+        info = validate_attributes(attribute_list, model)
+        operator, item, is_not = convert_operator(
+            node.operator, node.value, info.field if info else None
+        )
+        new_key = "{}{}".format(
+            "__".join(attribute_list), f"__{operator}" if operator else ""
+        )
+        return new_key, item, is_not
 
-    def _to_Q_order(self, data: t.List[str], model: type(Model)) -> t.List[str]:
+    def _to_Q_order(self, tree: GroupNode, model: type(Model)) -> t.List[str]:
         order_ = list()
-        for line in data:
-            attribute_list = line.split("__")[:-1]
-            operator = line.split("__")[-1]
+        for node in tree.children:
+            attribute_list = list(node.attributes)
             validate_attributes(attribute_list, model)
             operator, item, is_not = convert_operator(
-                operator, "__".join(attribute_list)
+                node.operator, "__".join(attribute_list)
             )
             order_.append(operator)
         return order_
 
-    def _and_convert(self, query: Q, data: t.List[t.Dict]) -> Q:
+    def _and_convert(self, children: t.List[t.Union[Q, t.Tuple]]) -> Q:
+        query = Q()
         result = dict()
-        for line in data:
-            if line:
-                result.update(line)
+        for child in children:
+            if isinstance(child, Q):
+                query &= child
+                continue
+            key, item, is_not = child
+            if is_not:
+                query &= ~Q(**{key: item})
+            else:
+                result[key] = item
 
         return query & Q(**result) if result else query
 
-    def _or_convert(self, query: Q, data: t.List[t.Dict]) -> Q:
-        query |= (Q(**line) for line in data if line)
+    def _or_convert(self, children: t.List[t.Union[Q, t.Tuple]]) -> Q:
+        query = Q()
+        for child in children:
+            if not isinstance(child, Q):
+                key, item, is_not = child
+                child = ~Q(**{key: item}) if is_not else Q(**{key: item})
+            query |= child
         return query
 
-    def _not_convert(self, query: Q, data: t.List[t.Dict]) -> Q:
-        return ~self._and_convert(query, data)
+    def _not_convert(self, children: t.List[t.Union[Q, t.Tuple]]) -> Q:
+        return ~self._and_convert(children)
 
 
 class StrongParser:
-    """Преобразование строки в словарь для фильтрации
+    """Преобразование строки в словарь для фильтрации.
+    Рекурсивный разбор через BracketParser, оставлен для обратной совместимости и сравнения
+    с QueryParser (см. benchmarks/parse_qs.py).
 
     """
 
@@ -0,0 +1,133 @@
+import threading
+import typing as t
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Model
+
+from snatch.exceptions import NoAttributeInModelError, EndAttributeError
+from snatch.search.tuples import PathInfo
+
+
+class FieldPathIndex:
+    """Индекс путей атрибутов модели.
+
+    Для каждой модели лениво строится словарь путей (кортежей атрибутов) в PathInfo: конечное поле,
+    модель поля, признак отношения, модель отношения, список соединений (join) и признак
+    множественного отношения на пути. Пути длиной до FIELD_PATH_DEPTH (SNATCH_FRAMEWORK) запоминаются,
+    более длинные пути вычисляются по запомненным префиксам.
+
+    """
+
+    default_max_depth = 5
+
+    def __init__(self, max_depth: t.Optional[int] = None):
+        self._max_depth = max_depth
+        self._indexes = dict()
+        self._lock = threading.Lock()
+
+    @property
+    def max_depth(self) -> int:
+        """Максимальная длина запоминаемого пути
+
+        Returns:
+            длина пути
+        """
+        if self._max_depth is None:
+            self._max_depth = int(
+                settings.SNATCH_FRAMEWORK.get("FIELD_PATH_DEPTH", self.default_max_depth)
+            )
+        return self._max_depth
+
+    def get_index(self, model: type(Model)) -> t.Dict[t.Tuple[str, ...], PathInfo]:
+        """Получение индекса путей модели
+
+        Args:
+            model: модель
+
+        Returns:
+            словарь путей модели
+        """
+        index = self._indexes.get(model)
+        if index is None:
+            with self._lock:
+                index = self._indexes.setdefault(model, dict())
+        return index
+
+    def resolve(
+        self, model: type(Model), attribute_list: t.Sequence[str]
+    ) -> t.Optional[PathInfo]:
+        """Получение информации о пути атрибутов модели
+
+        Args:
+            model: модель
+            attribute_list: список атрибутов
+
+        Returns:
+            информация о пути или None для пустого списка атрибутов
+        """
+        attributes = tuple(attribute_list)
+        index = self.get_index(model)
+        info = index.get(attributes)
+        if info is not None or not attributes:
+            return info
+
+        for i in range(len(attributes)):
+            prefix = attributes[: i + 1]
+            prefix_info = index.get(prefix)
+            if prefix_info is None:
+                prefix_info = self._resolve_next(model, info, prefix)
+                if len(prefix) <= self.max_depth:
+                    index[prefix] = prefix_info
+            info = prefix_info
+        return info
+
+    def clear(self):
+        """Очистка индексов всех моделей
+
+        Returns:
+
+        """
+        with self._lock:
+            self._indexes.clear()
+
+    def _resolve_next(
+        self, model: type(Model), info: t.Optional[PathInfo], prefix: t.Tuple[str, ...]
+    ) -> PathInfo:
+        """Получение информации о следующем атрибуте пути
+
+        Args:
+            model: исходная модель
+            info: информация о предыдущей части пути
+            prefix: путь, включая текущий атрибут
+
+        Returns:
+            информация о пути
+        """
+        if info is not None:
+            if not info.is_relation:
+                raise EndAttributeError(prefix[-2], info.model._meta.object_name)
+            model = info.related_model
+
+        attribute = model._meta.pk.name if "pk" == prefix[-1] else prefix[-1]
+        try:
+            field = model._meta.get_field(attribute)
+        except FieldDoesNotExist:
+            raise NoAttributeInModelError(attribute, model._meta.object_name)
+
+        joins = info.joins if info is not None else tuple()
+        many = info.many if info is not None else False
+        if field.is_relation:
+            joins += ("__".join(prefix),)
+            many = many or bool(field.one_to_many or field.many_to_many)
+        return PathInfo(
+            field,
+            model,
+            field.is_relation,
+            field.related_model if field.is_relation else None,
+            joins,
+            many,
+        )
+
+
+field_paths = FieldPathIndex()
@@ -0,0 +1,198 @@
+import re
+import typing as t
+
+from snatch.exceptions import QuerySyntaxError
+from snatch.search.operators.consts import DEFAULT_OPERATORS
+from snatch.search.tuples import Token, GroupNode, ConditionNode, OrderNode
+
+GROUP_OPERATORS = tuple(key for key in DEFAULT_OPERATORS if key.count(".") == 0)
+
+_token_pattern = re.compile(r"([(),])")
+
+_condition_pattern = re.compile(
+    "|".join([key for key in DEFAULT_OPERATORS if key.count(".") == 2])
+)
+_order_pattern = re.compile(
+    "(?:{})$".format("|".join([key for key in DEFAULT_OPERATORS if key.count(".") == 1]))
+)
+
+
+def tokenize(input_string: str) -> t.Iterator[t.Tuple[Token, Token]]:
+    """Разбиение строки запроса на токены за один проход
+
+    Args:
+        input_string: строка запроса
+
+    Returns:
+        итератор пар (атом, разделитель) с позициями в исходной строке,
+        последний разделитель - пустая строка (конец строки)
+    """
+    pieces = _token_pattern.split(input_string)
+    pieces.append("")
+    position = 0
+    for i in range(0, len(pieces), 2):
+        atom, delimiter = pieces[i], pieces[i + 1]
+        yield Token(atom, position), Token(delimiter, position + len(atom))
+        position += len(atom) + 1
+
+
+class QueryParser:
+    """Однопроходный разбор строки запроса в дерево (AST) без рекурсии.
+
+    Результат разбора - корневой GroupNode с оператором and, дочерними элементами которого являются
+    ConditionNode и GroupNode (для фильтрации) либо OrderNode (для сортировки).
+    Скобки без оператора раскрываются в родительскую группу.
+
+    """
+
+    def __call__(self, input_string: str, is_filter=True) -> GroupNode:
+        if not (input_string and isinstance(input_string, str) and input_string.strip()):
+            raise QuerySyntaxError(input_string, 0, "пустая строка запроса")
+
+        self.input_string = input_string
+        self.is_filter = is_filter
+
+        root = GroupNode("and", [], 0)
+        # элемент стека: (позиция открывающей скобки, список дочерних элементов, условие для списка значений)
+        stack = [(0, root.children, None)]
+        closed = False
+
+        for atom, delimiter in tokenize(input_string):
+            if closed and atom.value.strip():
+                raise QuerySyntaxError(
+                    input_string, atom.position, "ожидается ',' или ')'"
+                )
+            _, children, values_of = stack[-1]
+
+            if delimiter.value == "(":
+                if closed:
+                    raise QuerySyntaxError(
+                        input_string, delimiter.position, "ожидается ',' или ')'"
+                    )
+                if values_of is not None:
+                    raise QuerySyntaxError(
+                        input_string,
+                        delimiter.position,
+                        "вложенные скобки в списке значений",
+                    )
+                stack.append(self._open(delimiter, atom, children))
+                closed = False
+                continue
+
+            self._flush(atom, children, values_of)
+            closed = delimiter.value == ")"
+            if closed:
+                if len(stack) == 1:
+                    raise QuerySyntaxError(
+                        input_string, delimiter.position, "лишняя закрывающая скобка"
+                    )
+                stack.pop()
+                if values_of is not None:
+                    stack[-1][1].append(values_of._replace(value=children))
+            elif not delimiter.value and len(stack) > 1:
+                raise QuerySyntaxError(input_string, stack[-1][0], "не закрыта скобка")
+
+        return root
+
+    def _open(
+        self, token: Token, pending: Token, children: t.List
+    ) -> t.Tuple[int, t.List, t.Optional[ConditionNode]]:
+        """Обработка открывающей скобки
+
+        Args:
+            token: токен открывающей скобки
+            pending: атом перед скобкой
+            children: список дочерних элементов текущей группы
+
+        Returns:
+            новый элемент стека
+        """
+        text = pending.value.strip()
+        if not text:
+            return token.position, children, None
+        if self.is_filter and text in GROUP_OPERATORS:
+            group = GroupNode(text, [], pending.position)
+            children.append(group)
+            return token.position, group.children, None
+        if self.is_filter:
+            condition = self._condition(pending)
+            if not condition.value:
+                return token.position, [], condition
+        raise QuerySyntaxError(
+            self.input_string, token.position, "неожиданная открывающая скобка"
+        )
+
+    def _flush(
+        self,
+        pending: Token,
+        children: t.List,
+        values_of: t.Optional[ConditionNode],
+    ):
+        """Добавление накопленного атома в текущую группу или список значений
+
+        Args:
+            pending: атом
+            children: список дочерних элементов текущей группы
+            values_of: условие, для которого собирается список значений
+
+        Returns:
+
+        """
+        if values_of is not None:
+            value = pending.value.strip()
+            if value:
+                children.append(value)
+        elif pending.value.strip():
+            node = self._condition(pending) if self.is_filter else self._order(pending)
+            if self.is_filter and not node.value:
+                raise QuerySyntaxError(
+                    self.input_string,
+                    pending.position + len(pending.value),
+                    f"не указано значение для оператора {node.operator}",
+                )
+            children.append(node)
+
+    def _condition(self, token: Token) -> ConditionNode:
+        """Разбор условия фильтрации вида attribute.operator.value
+
+        Args:
+            token: атом с условием
+
+        Returns:
+            узел условия
+        """
+        result = _condition_pattern.search(token.value)
+        if not result:
+            raise QuerySyntaxError(
+                self.input_string,
+                token.position,
+                f"не найден оператор фильтрации в {token.value}",
+            )
+        return ConditionNode(
+            tuple(token.value[: result.start()].split(".")),
+            result.group()[1:-1],
+            token.value[result.end() :],
+            token.position,
+        )
+
+    def _order(self, token: Token) -> OrderNode:
+        """Разбор параметра сортировки вида attribute.asc или attribute.desc
+
+        Args:
+            token: атом с параметром сортировки
+
+        Returns:
+            узел сортировки
+        """
+        result = _order_pattern.search(token.value)
+        if not result:
+            raise QuerySyntaxError(
+                self.input_string,
+                token.position,
+                f"не найден оператор сортировки в {token.value}",
+            )
+        return OrderNode(
+            tuple(token.value[: result.start()].split(".")),
+            result.group()[1:],
+            token.position,
+        )
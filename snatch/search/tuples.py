@@ -4,3 +4,17 @@ BracketParser = namedtuple(
     "BracketParser",
     ["input_string", "num_opn", "num_cls", "list_stack", "drop_key_stack"],
 )
+
+Token = namedtuple("Token", ["value", "position"])
+
+GroupNode = namedtuple("GroupNode", ["operator", "children", "position"])
+
+ConditionNode = namedtuple(
+    "ConditionNode", ["attributes", "operator", "value", "position"]
+)
+
+OrderNode = namedtuple("OrderNode", ["attributes", "operator", "position"])
+
+PathInfo = namedtuple(
+    "PathInfo", ["field", "model", "is_relation", "related_model", "joins", "many"]
+)
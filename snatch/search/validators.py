@@ -1,16 +1,15 @@
 import typing as t
 
-from django.core.exceptions import FieldDoesNotExist
-from django.db.models import Model
-
-from snatch.exceptions import (
-    BracketsError,
-    NoAttributeInModelError,
-    EndAttributeError,
-    NotValidOperatorError,
-)
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Model, Field
+
+from snatch.exceptions import BracketsError, NotValidOperatorError, NotValidValueError
+from snatch.search.lookups import supports_any
 from snatch.search.operators import converters
 from snatch.search.operators.consts import DEFAULT_OPERATORS
+from snatch.search.paths import field_paths
+from snatch.search.tuples import PathInfo
 
 
 def validate_brackets(input_str: str):
@@ -38,7 +37,7 @@ def validate_brackets(input_str: str):
             raise BracketsError(input_str)
 
 
-def validate_attributes(attribute_list: t.List, model: Model):
+def validate_attributes(attribute_list: t.List, model: Model) -> t.Optional[PathInfo]:
     """Проверка на валидность списка атрибутов для поиска
 
     Args:
@@ -46,27 +45,20 @@ def validate_attributes(attribute_list: t.List, model: Model):
         model: модель Django для валидации
 
     Returns:
-
+        информация о пути атрибутов из индекса модели
     """
-    count_level = len(attribute_list)
-    for i, attribute in enumerate(attribute_list):
-        attribute = model._meta.pk.name if "pk" == attribute else attribute
-        try:
-            field = model._meta.get_field(attribute)
-            if field.is_relation:
-                model = field.related_model
-            elif i != count_level - 1:
-                raise EndAttributeError(attribute, model._meta.object_name)
-        except FieldDoesNotExist:
-            raise NoAttributeInModelError(attribute, model._meta.object_name)
-
-
-def convert_operator(operator: str, value: t.Any) -> t.Tuple[str, t.Any, bool]:
+    return field_paths.resolve(model, attribute_list)
+
+
+def convert_operator(
+    operator: str, value: t.Any, field: t.Optional[Field] = None
+) -> t.Tuple[str, t.Any, bool]:
     """Валидация и преобразование оператора и значения оператора
 
     Args:
         operator: оператор
         value: значение оператора
+        field: поле модели, к которому применяется оператор (для приведения типа значения)
 
     Returns:
         оператор, значение оператора, признак отрицания
@@ -80,4 +72,48 @@ def convert_operator(operator: str, value: t.Any) -> t.Tuple[str, t.Any, bool]:
     is_not = False
     if func:
         operator, value, is_not = func(value)
+    if field is not None:
+        operator, value = coerce_value(operator, value, field)
     return operator, value, is_not
+
+
+def coerce_value(operator: str, value: t.Any, field: Field) -> t.Tuple[str, t.Any]:
+    """Приведение значения оператора к типу поля модели
+
+    Args:
+        operator: оператор в нотации Django
+        value: значение оператора
+        field: поле модели
+
+    Returns:
+        оператор, значение оператора
+    """
+    if operator in ["isnull", "contains", "startswith", "endswith"]:
+        return operator, value
+    is_any = supports_any(field)
+    if field.is_relation:
+        field = field.target_field
+
+    try:
+        if operator in ["year", "month", "day"]:
+            return operator, int(value)
+        if operator in ["in", "overlap"]:
+            if operator == "overlap":
+                field = getattr(field, "base_field", field)
+            values = [
+                field.to_python(item)
+                for item in (value if isinstance(value, list) else [value])
+            ]
+            threshold = settings.SNATCH_FRAMEWORK.get("ANY_LOOKUP_THRESHOLD", 20)
+            if operator == "in" and is_any and len(values) > threshold:
+                operator = "any"
+            return operator, values
+        if operator == "range":
+            if not isinstance(value, list) or len(value) != 2:
+                raise NotValidValueError(operator, value)
+            return operator, [field.to_python(item) for item in value]
+        if isinstance(value, list):
+            raise NotValidValueError(operator, value)
+        return operator, field.to_python(value)
+    except (ValidationError, ValueError, TypeError):
+        raise NotValidValueError(operator, value)
@@ -0,0 +1,61 @@
+import typing as t
+from itertools import islice
+
+from django.db.models import Model, QuerySet, prefetch_related_objects
+from rest_framework.renderers import JSONRenderer
+
+
+class JSONStream:
+    """Потоковый вывод списка в формате JSON.
+
+    Список выводится фрагментами: открывающая скобка, сериализованные порции записей через запятую
+    и закрывающая скобка. Каждая порция кодируется тем же JSONRenderer, что и обычный ответ, поэтому
+    результат совпадает с ответом без потокового вывода, а в памяти одновременно находится только одна
+    порция записей.
+
+    """
+
+    renderer_class = JSONRenderer
+
+    def __init__(self, chunk_size: int = 2000):
+        self.chunk_size = chunk_size
+
+    def __call__(self, chunks: t.Iterable[t.List]) -> t.Iterator[bytes]:
+        """Получение фрагментов JSON массива
+
+        Args:
+            chunks: итератор сериализованных порций записей
+
+        Returns:
+            итератор фрагментов ответа
+        """
+        renderer = self.renderer_class()
+        yield b"["
+        separator = b""
+        for chunk in chunks:
+            content = renderer.render(chunk)[1:-1]
+            if content:
+                yield separator + content
+                separator = b","
+        yield b"]"
+
+    def iter_objects(self, queryset: QuerySet) -> t.Iterator[t.List[Model]]:
+        """Получение порций объектов модели через серверный курсор
+
+        QuerySet.iterator() не выполняет prefetch_related, поэтому он применяется к каждой порции отдельно.
+
+        Args:
+            queryset: множество записей
+
+        Returns:
+            итератор порций объектов модели
+        """
+        lookups = queryset._prefetch_related_lookups
+        iterator = queryset.iterator(chunk_size=self.chunk_size)
+        while True:
+            chunk = list(islice(iterator, self.chunk_size))
+            if not chunk:
+                return
+            if lookups:
+                prefetch_related_objects(chunk, *lookups)
+            yield chunk
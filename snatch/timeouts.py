@@ -0,0 +1,104 @@
+import time
+import typing as t
+from contextlib import contextmanager
+
+from django.db import connections, router, transaction
+from django.db.models import Model
+
+from snatch.exceptions import QueryTimeoutException
+
+QUERY_CANCELED = "57014"
+
+
+class QueryTimeout:
+    """Ограничение времени выполнения запросов к БД при обработке HTTP запроса.
+
+    statement_timeout (мс) ограничивает время одного SQL запроса: в PostgreSQL выполняется
+    SET LOCAL statement_timeout в транзакции, внутри которой выполняются получение и сериализация записей.
+    budget (мс) ограничивает суммарное время выполнения SQL запросов (время сериализации и передачи ответа
+    не учитывается): проверяется перед и после каждого запроса, а в PostgreSQL дополнительно ограничивает
+    statement_timeout, в том числе для запросов через курсор драйвера (COPY выгрузки), которые не проходят
+    через обертку запросов Django. Значение 0 отключает соответствующее ограничение.
+
+    """
+
+    def __init__(self, statement_timeout: int = 0, budget: int = 0):
+        self.statement_timeout = statement_timeout
+        self.budget = budget
+
+    @contextmanager
+    def __call__(self, model: type(Model), using: t.Optional[str] = None) -> t.Iterator:
+        """Выполнение запросов к БД модели с ограничением времени
+
+        Args:
+            model: модель
+            using: алиас БД (по-умолчанию - БД для чтения модели по роутеру Django)
+
+        Returns:
+
+        """
+        if not self.statement_timeout and not self.budget:
+            yield
+            return
+
+        using = using or router.db_for_read(model)
+        connection = connections[using]
+        class_name = model._meta.object_name
+        spent = [0.0]
+
+        def execute(execute_, sql, params, many, context):
+            self._check_budget(class_name, spent[0])
+            start = time.monotonic()
+            try:
+                return execute_(sql, params, many, context)
+            finally:
+                spent[0] += time.monotonic() - start
+                self._check_budget(class_name, spent[0])
+
+        timeout = min(value for value in (self.statement_timeout, self.budget) if value)
+        try:
+            if connection.vendor != "postgresql":
+                with connection.execute_wrapper(execute):
+                    yield
+                return
+            with transaction.atomic(using=using):
+                with connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL statement_timeout = %s", [int(timeout)])
+                with connection.execute_wrapper(execute):
+                    yield
+        except Exception as ex:
+            if self._is_canceled(ex):
+                raise QueryTimeoutException(
+                    class_name, "statement", self._elapsed(spent[0]), int(timeout)
+                ) from ex
+            raise
+
+    def _check_budget(self, class_name: str, spent: float):
+        """Проверка суммарного времени выполнения запросов
+
+        Args:
+            class_name: название модели
+            spent: суммарное время выполнения запросов (сек.)
+
+        Returns:
+
+        """
+        elapsed = self._elapsed(spent)
+        if self.budget and elapsed > self.budget:
+            raise QueryTimeoutException(class_name, "budget", elapsed, self.budget)
+
+    @staticmethod
+    def _is_canceled(ex: Exception) -> bool:
+        """Проверка отмены запроса по statement_timeout (ошибка Django или драйвера PostgreSQL)
+
+        Args:
+            ex: ошибка БД
+
+        Returns:
+            True, если запрос отменен
+        """
+        return QUERY_CANCELED in (getattr(ex, "pgcode", None), getattr(ex.__cause__, "pgcode", None))
+
+    @staticmethod
+    def _elapsed(spent: float) -> int:
+        return int(spent * 1000)
@@ -1,20 +1,72 @@
-from django.db.models import Model, Field
+import json
+import typing as t
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Model, Field, QuerySet
+from django.urls import get_script_prefix, get_urlconf
 from rest_framework.reverse import reverse
 from rest_framework.serializers import ModelSerializer
 
+_route_urls = dict()
+
+
+def get_route_url(model: type(Model), route: str) -> str:
+    """Получение пути эндпойнта таблицы модели
+
+    Результат reverse() запоминается по ключу (модель, эндпойнт, urlconf, префикс скрипта) при первом обращении,
+    поэтому ссылки остаются верными при SCRIPT_NAME, urlconf запроса и нескольких экземплярах роутера.
+
+    Args:
+        model: модель
+        route: суффикс имени эндпойнта (list, detail, ...)
+
+    Returns:
+        путь эндпойнта
+    """
+    key = (model, route, get_urlconf(settings.ROOT_URLCONF), get_script_prefix())
+    url = _route_urls.get(key)
+    if url is None:
+        table_schema, table_name = model._meta.db_table.split('"."')
+        url = _route_urls[key] = reverse(f"{table_schema}_{table_name}_{route}")
+    return url
+
+
+def get_owner_route_url(owner: t.Any, model: type(Model), route: str) -> str:
+    """Получение пути эндпойнта таблицы модели с запоминанием в сериализаторе или поле
+
+    Сериализатор и его поля создаются на время запроса, поэтому префикс скрипта и urlconf для них не меняются,
+    а путь вычисляется один раз на сериализатор вместо каждой строки.
+
+    Args:
+        owner: сериализатор или поле сериализатора
+        model: модель
+        route: суффикс имени эндпойнта
+
+    Returns:
+        путь эндпойнта
+    """
+    urls = owner.__dict__.get("_snatch_route_urls")
+    if urls is None:
+        urls = owner.__dict__["_snatch_route_urls"] = dict()
+    url = urls.get((model, route))
+    if url is None:
+        url = urls[(model, route)] = get_route_url(model, route)
+    return url
 
-def get_link_many(field: Field, instance: Model) -> str:
+
+def get_link_many(field: Field, instance: Model, owner: t.Any = None) -> str:
     """Получение ссылки для множества объектов
 
     Args:
         field: поле дочерней модели, которое ссылается на родительскую модель
         instance: объект родительской модели
+        owner: сериализатор или поле, в котором запоминается путь эндпойнта
 
     Returns:
         ссылка на список дочерних объектов
     """
-    table_schema, table_name = field.model._meta.db_table.split('"."')
-    url = reverse(f"{table_schema}_{table_name}_list")
+    url = get_route_url(field.model, "list") if owner is None else get_owner_route_url(owner, field.model, "list")
     return f"{url}?query={field.name}.eq.{instance.pk}"
 
 
@@ -28,7 +80,48 @@ def get_link_one(serializer: ModelSerializer, instance: Model) -> str:
     Returns:
         ссылка на объект
     """
-    pk_name = instance._meta.pk.name
-    table_schema, table_name = serializer.Meta.model._meta.db_table.split('"."')
-    url = reverse(f"{table_schema}_{table_name}_detail")
-    return f"{url}?query={pk_name}.eq.{instance.pk}"
+    url = get_owner_route_url(serializer, serializer.Meta.model, "detail")
+    return f"{url}?query={instance._meta.pk.name}.eq.{instance.pk}"
+
+
+def explain_plan(queryset: QuerySet) -> t.Optional[t.Dict]:
+    """Получение плана запроса PostgreSQL без его выполнения (EXPLAIN (FORMAT JSON))
+
+    Args:
+        queryset: множество записей
+
+    Returns:
+        корневой узел плана или None, если БД не PostgreSQL
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+    sql, params = queryset.query.get_compiler(using=queryset.db).as_sql()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]
+
+
+def parse_fields(fields_string: t.Optional[str]) -> t.Optional[t.Dict]:
+    """Преобразование параметра fields (список путей полей через запятую) в дерево полей
+
+    Пример: "id,name,task.name" -> {"id": {}, "name": {}, "task": {"name": {}}}
+
+    Args:
+        fields_string: значение параметра fields
+
+    Returns:
+        дерево полей или None, если параметр не указан
+    """
+    if not fields_string:
+        return None
+    tree = dict()
+    for path in fields_string.split(","):
+        node = tree
+        for name in path.strip().split("."):
+            if name:
+                node = node.setdefault(name, dict())
+    return tree or None
@@ -0,0 +1,371 @@
+import threading
+import typing as t
+from collections import namedtuple
+from itertools import islice
+
+from django.db import models
+from django.db.models import QuerySet
+from rest_framework import fields as drf_fields
+from rest_framework.relations import PKOnlyObject, PrimaryKeyRelatedField
+from rest_framework.serializers import BaseSerializer
+
+from snatch.exceptions import FilterException
+from snatch.fields import SnatchSerializerMethodField
+from snatch.mixins import SnatchSerializationMixin
+from snatch.search.paths import field_paths
+from snatch.utils import get_route_url
+
+# виды узлов плана
+VALUE, PK, LINK, NESTED = range(4)
+
+ValuesNode = namedtuple(
+    "ValuesNode", ["key", "kind", "index", "convert", "model", "children"]
+)
+
+ValuesPlan = namedtuple("ValuesPlan", ["columns", "nodes"])
+
+# поля сериализатора, значения которых из БД выводятся без преобразования
+IDENTITY_FIELDS = {
+    drf_fields.CharField: (models.CharField, models.TextField),
+    drf_fields.IntegerField: (models.IntegerField,),
+    drf_fields.BooleanField: (models.BooleanField,),
+}
+
+
+class ValuesSerializer:
+    """Быстрая сериализация списка записей через values_list() без создания объектов модели.
+
+    По графу сериализатора, уровню вложенности и дереву полей один раз строится план: список колонок
+    для values_list() и для каждого поля ответа - индекс колонки и функция преобразования значения
+    (to_representation поля сериализатора). Вложенные сериализаторы прямых отношений загружаются
+    колонками через join и оборачиваются в self и link так же, как в SnatchSerializationMixin.
+    План недоступен (is_available = False), если в выводимых полях есть обратные или множественные
+    отношения, SnatchSerializerMethodField, поля без соответствующей колонки модели или сериализаторы
+    с собственным to_representation. В этом случае используется обычная сериализация.
+
+    """
+
+    _plans = dict()
+    _lock = threading.Lock()
+
+    def __init__(
+        self, serializer_class, max_level: int, fields: t.Optional[t.Dict] = None
+    ):
+        self.serializer_class = serializer_class
+        self.max_level = max_level
+        self.fields = fields
+        self.plan = self.get_plan()
+
+    @property
+    def is_available(self) -> bool:
+        """Признак возможности быстрой сериализации
+
+        Returns:
+            True, если план построен
+        """
+        return self.plan is not None
+
+    def __call__(self, queryset: QuerySet) -> t.List[t.Dict]:
+        """Сериализация множества записей
+
+        Args:
+            queryset: множество записей (с учетом фильтрации, сортировки и пагинации)
+
+        Returns:
+            список сериализованных записей
+        """
+        return self.serialize_rows(self.get_rows(queryset))
+
+    def get_rows(self, queryset: QuerySet, *extra: str) -> QuerySet:
+        """Получение множества строк values_list() по плану
+
+        Args:
+            queryset: множество записей
+            extra: дополнительные колонки (аннотации) в конце строки
+
+        Returns:
+            множество строк
+        """
+        return queryset.prefetch_related(None).values_list(*self.plan.columns, *extra)
+
+    def serialize_rows(self, rows: t.Iterable[t.Tuple]) -> t.List[t.Dict]:
+        """Сериализация строк values_list()
+
+        Args:
+            rows: строки values_list()
+
+        Returns:
+            список сериализованных записей
+        """
+        urls = dict()
+        self._resolve_urls(self.plan.nodes, urls)
+        nodes = self.plan.nodes
+        return [self._build(row, nodes, urls) for row in rows]
+
+    def iter_chunks(self, queryset: QuerySet, chunk_size: int) -> t.Iterator[t.List[t.Dict]]:
+        """Сериализация множества записей порциями через серверный курсор
+
+        Args:
+            queryset: множество записей
+            chunk_size: количество записей в порции
+
+        Returns:
+            итератор порций сериализованных записей
+        """
+        rows = self.get_rows(queryset).iterator(chunk_size=chunk_size)
+        while True:
+            chunk = self.serialize_rows(islice(rows, chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
+    def get_plan(self) -> t.Optional[ValuesPlan]:
+        """Получение плана сериализации
+
+        Returns:
+            план сериализации или None, если быстрая сериализация невозможна
+        """
+        if self.fields is not None:
+            return self._compile()
+        key = (self.serializer_class, self.max_level)
+        if key not in self._plans:
+            plan = self._compile()
+            with self._lock:
+                self._plans[key] = plan
+        return self._plans[key]
+
+    def _compile(self) -> t.Optional[ValuesPlan]:
+        """Построение плана сериализации
+
+        Returns:
+            план сериализации или None, если быстрая сериализация невозможна
+        """
+        if self.max_level <= 0:
+            # ошибка уровня вложенности формируется обычной сериализацией
+            return None
+        serializer = self.serializer_class()
+        if not self._is_snatch(serializer):
+            return None
+        pk_name = serializer.Meta.model._meta.pk.name
+        columns = {pk_name: 0}
+        nodes = self._walk(serializer, self.max_level, self.fields, "", columns)
+        if nodes is None:
+            return None
+        return ValuesPlan(tuple(columns), nodes)
+
+    def _walk(
+        self,
+        serializer: BaseSerializer,
+        level: int,
+        fields: t.Optional[t.Dict],
+        prefix: str,
+        columns: t.Dict[str, int],
+    ) -> t.Optional[t.Tuple[ValuesNode, ...]]:
+        """Обход полей сериализатора
+
+        Args:
+            serializer: сериализатор
+            level: уровень вложенности сериализатора (max_level до его уменьшения)
+            fields: дерево запрошенных полей сериализатора (None - все поля)
+            prefix: путь от модели списка до модели сериализатора
+            columns: колонки values_list() с их индексами
+
+        Returns:
+            узлы плана или None, если быстрая сериализация невозможна
+        """
+        model = serializer.Meta.model
+        nodes = list()
+        for field in serializer._readable_fields:
+            if fields and field.field_name not in fields:
+                continue
+            key = field.field_name
+            field = getattr(field, "proxied", field)
+            info = self._resolve(model, field)
+            if info is None or info.many:
+                return None
+            column = f"{prefix}{field.source}"
+            index = columns.setdefault(column, len(columns))
+
+            if isinstance(field, BaseSerializer):
+                if not self._is_snatch(field) or not self._is_pk_relation(info):
+                    return None
+                related_model = field.Meta.model
+                if level - 1 <= 0:
+                    nodes.append(ValuesNode(key, LINK, index, None, related_model, None))
+                    continue
+                children = self._walk(
+                    field,
+                    level - 1,
+                    (fields.get(key) or None) if fields else None,
+                    f"{column}__",
+                    columns,
+                )
+                if children is None:
+                    return None
+                nodes.append(ValuesNode(key, NESTED, index, None, related_model, children))
+            elif isinstance(field, PrimaryKeyRelatedField):
+                if not info.is_relation:
+                    return None
+                nodes.append(
+                    ValuesNode(
+                        key, PK, index, self._pk_converter(field), info.related_model, None
+                    )
+                )
+            else:
+                if info.is_relation or not self._is_plain(field):
+                    return None
+                nodes.append(
+                    ValuesNode(
+                        key, VALUE, index, self._converter(field, info.field), None, None
+                    )
+                )
+        return tuple(nodes)
+
+    def _build(self, row: t.Tuple, nodes: t.Tuple[ValuesNode, ...], urls: t.Dict) -> t.Dict:
+        """Сериализация строки values_list() по узлам плана
+
+        Args:
+            row: строка values_list()
+            nodes: узлы плана
+            urls: ссылки на эндпойнты моделей вложенных сериализаторов
+
+        Returns:
+            сериализованная запись
+        """
+        ret = dict()
+        for key, kind, index, convert, model, children in nodes:
+            value = row[index]
+            if kind == VALUE:
+                ret[key] = value if value is None or convert is None else convert(value)
+            elif value is None:
+                ret[key] = {"link": None, "self": None}
+            elif kind == PK:
+                ret[key] = convert(value)
+            else:
+                url, pk_name = urls[model]
+                if kind == NESTED:
+                    value_self = self._build(row, children, urls) or None
+                else:
+                    value_self = None
+                ret[key] = {
+                    "link": f"{url}?query={pk_name}.eq.{value}",
+                    "self": value_self,
+                }
+        return ret
+
+    def _resolve_urls(self, nodes: t.Tuple[ValuesNode, ...], urls: t.Dict):
+        """Получение ссылок на эндпойнты моделей вложенных сериализаторов (один раз на запрос)
+
+        Args:
+            nodes: узлы плана
+            urls: словарь для заполнения ссылками
+
+        Returns:
+
+        """
+        for node in nodes:
+            if node.kind in (LINK, NESTED) and node.model not in urls:
+                urls[node.model] = (get_route_url(node.model, "detail"), node.model._meta.pk.name)
+            if node.kind == NESTED:
+                self._resolve_urls(node.children, urls)
+
+    def _resolve(self, model, field):
+        """Получение информации о поле модели, соответствующем полю сериализатора
+
+        Args:
+            model: модель сериализатора
+            field: поле сериализатора
+
+        Returns:
+            информация о поле модели или None, если поле сериализатора не связано с полем модели
+        """
+        if not field.source or "." in field.source or field.source == "*":
+            return None
+        try:
+            return field_paths.resolve(model, [field.source])
+        except FilterException:
+            return None
+
+    @staticmethod
+    def _is_snatch(serializer: BaseSerializer) -> bool:
+        """Проверка, что сериализатор выводит объекты стандартной сериализацией Snatch
+
+        Args:
+            serializer: сериализатор
+
+        Returns:
+            True, если сериализатор не переопределяет to_representation
+        """
+        return (
+            isinstance(serializer, SnatchSerializationMixin)
+            and type(serializer).to_representation
+            is SnatchSerializationMixin.to_representation
+        )
+
+    @staticmethod
+    def _is_pk_relation(info) -> bool:
+        """Проверка, что поле - прямое отношение по первичному ключу связанной модели
+
+        Args:
+            info: информация о поле модели
+
+        Returns:
+            True, если значение колонки отношения равно первичному ключу связанного объекта
+        """
+        return (
+            info.is_relation
+            and (info.field.many_to_one or info.field.one_to_one)
+            and info.field.concrete
+            and info.field.target_field == info.related_model._meta.pk
+        )
+
+    @staticmethod
+    def _is_plain(field) -> bool:
+        """Проверка, что значение поля сериализатора получается из колонки модели
+
+        Args:
+            field: поле сериализатора
+
+        Returns:
+            True, если поле не зависит от объекта модели и контекста запроса
+        """
+        return (
+            type(field).get_attribute is drf_fields.Field.get_attribute
+            and not isinstance(
+                field,
+                (
+                    SnatchSerializerMethodField,
+                    drf_fields.SerializerMethodField,
+                    drf_fields.FileField,
+                    drf_fields.HiddenField,
+                ),
+            )
+        )
+
+    @staticmethod
+    def _converter(field, model_field) -> t.Optional[t.Callable]:
+        """Получение функции преобразования значения колонки
+
+        Args:
+            field: поле сериализатора
+            model_field: поле модели
+
+        Returns:
+            функция преобразования или None, если значение выводится без преобразования
+        """
+        model_fields = IDENTITY_FIELDS.get(type(field))
+        if model_fields and isinstance(model_field, model_fields) and not model_field.choices:
+            return None
+        return field.to_representation
+
+    @staticmethod
+    def _pk_converter(field: PrimaryKeyRelatedField) -> t.Callable:
+        """Получение функции преобразования значения колонки отношения без вложенного сериализатора
+
+        Args:
+            field: поле сериализатора
+
+        Returns:
+            функция преобразования
+        """
+        return lambda value: field.to_representation(PKOnlyObject(value))
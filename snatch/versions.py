@@ -0,0 +1,247 @@
+import threading
+import typing as t
+from collections import OrderedDict
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Model, Q
+from django.db.models.signals import post_delete, post_save
+from rest_framework.serializers import BaseSerializer, ListSerializer
+
+from snatch.exceptions import FilterException
+from snatch.fields import SnatchSerializerMethodField
+from snatch.search.paths import field_paths
+
+
+class TableVersions:
+    """Версии таблиц БД для валидаторов HTTP кэширования.
+
+    Версия таблицы - случайный токен в кэше Django (алиас VERSION_CACHE в SNATCH_FRAMEWORK), который заменяется
+    после фиксации транзакции, изменившей записи таблицы: по сигналам post_save/post_delete моделей представлений
+    snatch (watch) и явно при пакетных и массовых операциях, которые сигналы не отправляют. Для нескольких
+    процессов необходим общий кэш (redis, memcached): в локальном кэше процесса версия не меняется
+    в остальных процессах.
+    Зависимости сериализатора (таблицы, данные которых попадают в ответ с учетом max_level) вычисляются
+    один раз для пары (класс сериализатора, max_level) и хранятся в LRU-кэше размером DEPENDENCY_CACHE_SIZE.
+
+    """
+
+    key_prefix = "snatch:version:"
+
+    def __init__(self, cache_alias: t.Optional[str] = None):
+        self._cache_alias = cache_alias
+        self._dependencies = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def cache_size(self) -> int:
+        """Размер кэша зависимостей сериализаторов
+
+        Returns:
+            максимальное количество пар (класс сериализатора, max_level)
+        """
+        return settings.SNATCH_FRAMEWORK.get("DEPENDENCY_CACHE_SIZE", 256)
+
+    @property
+    def cache(self):
+        """Кэш для хранения версий
+
+        Returns:
+            кэш Django
+        """
+        if self._cache_alias is None:
+            self._cache_alias = settings.SNATCH_FRAMEWORK.get("VERSION_CACHE", "default")
+        return caches[self._cache_alias]
+
+    def get_key(self, model: type(Model)) -> str:
+        """Получение ключа кэша для таблицы модели
+
+        Args:
+            model: модель
+
+        Returns:
+            ключ кэша
+        """
+        return f"{self.key_prefix}{model._meta.concrete_model._meta.db_table}"
+
+    def get_many(self, models: t.Iterable[type(Model)]) -> t.List[str]:
+        """Получение версий таблиц
+
+        Args:
+            models: модели
+
+        Returns:
+            список версий в порядке моделей
+        """
+        keys = [self.get_key(model) for model in models]
+        versions = self.cache.get_many(keys)
+        for key in keys:
+            if key not in versions:
+                self.cache.add(key, uuid4().hex, None)
+                versions[key] = self.cache.get(key)
+        return [versions[key] for key in keys]
+
+    def bump(self, *models: type(Model), using: t.Optional[str] = None):
+        """Смена версий таблиц после фиксации транзакции, изменившей записи (вне транзакции - сразу).
+        До фиксации читатель видит прежние записи, поэтому новая версия не должна быть ему доступна.
+
+        Args:
+            models: модели
+            using: алиас БД, в которой изменены записи
+
+        Returns:
+
+        """
+        keys = [self.get_key(model) for model in models]
+        transaction.on_commit(
+            lambda: self.cache.set_many({key: uuid4().hex for key in keys}, None), using=using
+        )
+
+    def watch(self, *models: type(Model)):
+        """Подключение смены версий таблиц по сигналам post_save/post_delete моделей
+
+        Args:
+            models: модели
+
+        Returns:
+
+        """
+        for model in models:
+            label = model._meta.label_lower
+            post_save.connect(
+                bump_table_version, sender=model, dispatch_uid=f"snatch_version_save:{label}"
+            )
+            post_delete.connect(
+                bump_table_version, sender=model, dispatch_uid=f"snatch_version_delete:{label}"
+            )
+
+    def get_graph_models(self, serializer_class) -> t.Tuple[type(Model), ...]:
+        """Получение моделей графа сериализатора без ограничения уровня вложенности
+
+        Args:
+            serializer_class: класс сериализатора
+
+        Returns:
+            кортеж моделей (первая - модель сериализатора)
+        """
+        models = dict()
+        self._walk(serializer_class(), None, models, dict())
+        return tuple(models)
+
+    def get_dependencies(self, serializer_class, max_level: int) -> t.Tuple[type(Model), ...]:
+        """Получение моделей, данные которых попадают в ответ сериализатора
+
+        Args:
+            serializer_class: класс сериализатора
+            max_level: максимальный уровень вложенности
+
+        Returns:
+            кортеж моделей (первая - модель сериализатора)
+        """
+        key = (serializer_class, max_level)
+        with self._lock:
+            dependencies = self._dependencies.get(key)
+            if dependencies is not None:
+                self._dependencies.move_to_end(key)
+                return dependencies
+        models = dict()
+        self._walk(serializer_class(), max_level, models, dict())
+        dependencies = tuple(models)
+        cache_size = self.cache_size
+        if cache_size:
+            with self._lock:
+                self._dependencies[key] = dependencies
+                while len(self._dependencies) > cache_size:
+                    self._dependencies.popitem(last=False)
+        return dependencies
+
+    def get_query_models(
+        self, model: type(Model), filter_: t.Optional[Q], order_: t.Optional[t.List[str]]
+    ) -> t.Tuple[type(Model), ...]:
+        """Получение моделей отношений, через которые проходят параметры фильтрации и сортировки
+
+        Args:
+            model: модель
+            filter_: параметры фильтрации
+            order_: список полей сортировки
+
+        Returns:
+            кортеж моделей отношений
+        """
+        lookups, stack = list(order_ or []), [filter_] if filter_ else list()
+        while stack:
+            node = stack.pop()
+            for child in node.children:
+                if isinstance(child, Q):
+                    stack.append(child)
+                else:
+                    lookups.append(child[0])
+
+        models = dict()
+        for lookup in lookups:
+            attributes = lookup.lstrip("-").split("__")
+            for i in range(1, len(attributes) + 1):
+                try:
+                    info = field_paths.resolve(model, attributes[:i])
+                except FilterException:
+                    break
+                if info.is_relation:
+                    models.setdefault(info.related_model, None)
+        return tuple(models)
+
+    def _walk(
+        self,
+        serializer: BaseSerializer,
+        remaining: t.Optional[int],
+        models: t.Dict,
+        visited: t.Dict[type, t.Optional[int]],
+    ):
+        """Обход графа сериализатора. Сериализатор, уже пройденный с не меньшим оставшимся уровнем,
+        новых моделей не дает и повторно не обходится.
+
+        Args:
+            serializer: сериализатор
+            remaining: оставшийся уровень вложенности (None - без ограничения)
+            models: упорядоченный словарь найденных моделей
+            visited: наибольший оставшийся уровень, с которым пройден класс сериализатора
+
+        Returns:
+
+        """
+        if isinstance(serializer, ListSerializer):
+            serializer = serializer.child
+        serializer_class = type(serializer)
+        if serializer_class in visited:
+            seen = visited[serializer_class]
+            if seen is None or (remaining is not None and seen >= remaining):
+                return
+        visited[serializer_class] = remaining
+        model = serializer.Meta.model
+        models.setdefault(model, None)
+        if remaining is not None and remaining <= 0:
+            return
+        remaining = None if remaining is None else remaining - 1
+        for field in serializer._readable_fields:
+            field = getattr(field, "proxied", field)
+            if isinstance(field, BaseSerializer):
+                self._walk(field, remaining, models, visited)
+            elif isinstance(field, SnatchSerializerMethodField):
+                serializer_class = field.get_serializer_class()
+                if serializer_class:
+                    self._walk(serializer_class(), remaining, models, visited)
+                    continue
+                try:
+                    info = field_paths.resolve(model, [field.source])
+                except FilterException:
+                    continue
+                if info and info.related_model:
+                    models.setdefault(info.related_model, None)
+
+
+table_versions = TableVersions()
+
+
+def bump_table_version(sender, using=None, **kwargs):
+    table_versions.bump(sender, using=using)
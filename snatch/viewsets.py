@@ -1,12 +1,45 @@
+import hashlib
 import typing as t
 
 from django.conf import settings
-from django.db.models import Model, Q, QuerySet
+from django.db import router
+from django.db.models import Count, Max, Model, Q, QuerySet, Window
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework import status
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 
 from snatch import mixins
-from snatch.exceptions import GetObjectException, ModelFilterException, FilterException
+from snatch.aggregation import Aggregation
+from snatch.bulk import BulkWriter
+from snatch.counting import QueryCounter
+from snatch.mass import MassOperation
+from snatch.export import Exporter
+from snatch.imports import Importer
+from snatch.exceptions import (
+    BulkIntegrityException,
+    BulkValidationException,
+    GetObjectException,
+    MassOperationException,
+    ModelFilterException,
+    FilterException,
+    QueryCostException,
+    QueryTimeoutException,
+)
+from snatch.pagination import KeysetPagination
+from snatch.planner import QueryPlanner
+from snatch.replicas import ReplicaSelector
+from snatch.response_cache import ResponseCache
+from snatch.search.cost import QueryCostGuard
 from snatch.search.parse_qs import StrongCreator
+from snatch.streaming import JSONStream
+from snatch.timeouts import QueryTimeout
+from snatch.utils import parse_fields
+from snatch.values import ValuesSerializer
+from snatch.versions import table_versions
 
 
 class SnatchGenericViewSet(GenericViewSet):
@@ -14,6 +47,94 @@ class SnatchGenericViewSet(GenericViewSet):
 
     """
     page_size = settings.SNATCH_FRAMEWORK.get("PAGE_SIZE", 20)
+    cost_guard_class = QueryCostGuard
+    query_planner_class = QueryPlanner
+    keyset_pagination_class = KeysetPagination
+    counter_class = QueryCounter
+    values_serializer_class = ValuesSerializer
+    values_serialization = settings.SNATCH_FRAMEWORK.get("VALUES_SERIALIZATION", True)
+    stream_class = JSONStream
+    bulk_writer_class = BulkWriter
+    bulk_batch_size = settings.SNATCH_FRAMEWORK.get("BULK_BATCH_SIZE", 1000)
+    mass_operation_class = MassOperation
+    aggregation_class = Aggregation
+    mass_max_rows = settings.SNATCH_FRAMEWORK.get("MASS_MAX_ROWS", 1000)
+    mass_send_signals = settings.SNATCH_FRAMEWORK.get("MASS_SEND_SIGNALS", True)
+    stream_threshold = settings.SNATCH_FRAMEWORK.get("STREAM_THRESHOLD", 10000)
+    stream_chunk_size = settings.SNATCH_FRAMEWORK.get("STREAM_CHUNK_SIZE", 2000)
+    exporter_class = Exporter
+    importer_class = Importer
+    import_max_rejects = settings.SNATCH_FRAMEWORK.get("IMPORT_MAX_REJECTS", 1000)
+    count_mode = settings.SNATCH_FRAMEWORK.get("COUNT_MODE", "exact")
+    count_cap = settings.SNATCH_FRAMEWORK.get("COUNT_CAP", 1000)
+    count_cache_ttl = settings.SNATCH_FRAMEWORK.get("COUNT_CACHE_TTL", 60)
+    count_annotation = "snatch_window_count"
+    conditional_requests = settings.SNATCH_FRAMEWORK.get("CONDITIONAL_REQUESTS", False)
+    response_cache_class = ResponseCache
+    response_cache = settings.SNATCH_FRAMEWORK.get("RESPONSE_CACHE", False)
+    response_cache_alias = settings.SNATCH_FRAMEWORK.get("RESPONSE_CACHE_ALIAS", "default")
+    response_cache_timeout = settings.SNATCH_FRAMEWORK.get("RESPONSE_CACHE_TIMEOUT", 60)
+    query_timeout_class = QueryTimeout
+    statement_timeout = settings.SNATCH_FRAMEWORK.get("STATEMENT_TIMEOUT", 0)
+    time_budget = settings.SNATCH_FRAMEWORK.get("TIME_BUDGET", 0)
+    timeout_status = {
+        "statement": status.HTTP_503_SERVICE_UNAVAILABLE,
+        "budget": status.HTTP_504_GATEWAY_TIMEOUT,
+    }
+    replica_selector_class = ReplicaSelector
+    read_replicas = settings.SNATCH_FRAMEWORK.get("READ_REPLICAS", [])
+    replica_strategy = settings.SNATCH_FRAMEWORK.get("REPLICA_STRATEGY", "round_robin")
+    replica_max_lag = settings.SNATCH_FRAMEWORK.get("REPLICA_MAX_LAG", None)
+    replica_sticky = settings.SNATCH_FRAMEWORK.get("REPLICA_STICKY", 0)
+    read_actions = ("list", "retrieve", "size", "aggregate", "export", "info", "metadata")
+    last_modified_field = None
+    query_cost = None
+
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        cls.watch_tables()
+        return super().as_view(actions, **initkwargs)
+
+    @classmethod
+    def watch_tables(cls):
+        """Подключение смены версий таблиц по сигналам моделей представления и графа его сериализатора
+
+        Returns:
+
+        """
+        if cls.queryset is None:
+            return
+        models = (cls.queryset.model,)
+        if cls.serializer_class is not None:
+            models += table_versions.get_graph_models(cls.serializer_class)
+        table_versions.watch(*models)
+
+    def handle_exception(self, exc):
+        """Получение ответа на ошибку действия: ошибки snatch возвращаются с описанием и данными ошибки,
+        остальные обрабатываются DRF
+
+        Args:
+            exc: ошибка
+
+        Returns:
+            ответ
+        """
+        if isinstance(exc, (GetObjectException, ModelFilterException)):
+            return Response(data={"detail": str(exc)}, status=status.HTTP_404_NOT_FOUND)
+        if isinstance(exc, QueryCostException):
+            return Response(data={"detail": str(exc), "cost": exc.cost}, status=status.HTTP_400_BAD_REQUEST)
+        if isinstance(exc, QueryTimeoutException):
+            return Response(data={"detail": str(exc), "elapsed": exc.elapsed}, status=self.timeout_status[exc.kind])
+        if isinstance(exc, BulkValidationException):
+            return Response(data={"detail": str(exc), "errors": exc.errors}, status=status.HTTP_400_BAD_REQUEST)
+        if isinstance(exc, BulkIntegrityException):
+            return Response(
+                data={"detail": str(exc), "batch": {"start": exc.start, "end": exc.end}},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if isinstance(exc, MassOperationException):
+            return Response(data={"detail": str(exc), "count": exc.count}, status=status.HTTP_400_BAD_REQUEST)
+        return super().handle_exception(exc)
 
     def get_params(self) -> t.Dict:
         """Получение параметров запроса
@@ -26,13 +147,29 @@ class SnatchGenericViewSet(GenericViewSet):
             "order": self.request.query_params.get("order", None),
             "offset": int(self.request.query_params.get("offset", 0)),
             "limit": int(self.request.query_params.get("limit", self.page_size)),
+            "cursor": self.request.query_params.get("cursor", None),
+            "count_mode": self.request.query_params.get("count_mode", self.count_mode),
             "distinct": True
             if "distinct" in self.request.query_params.keys()
             else False,
+            "stream": True if "stream" in self.request.query_params.keys() else False,
+            "pk_only": True if "pk_only" in self.request.query_params.keys() else False,
+            "with_count": True
+            if "with_count" in self.request.query_params.keys()
+            else False,
+            "dry_run": True if "dry_run" in self.request.query_params.keys() else False,
             "max_level": int(self.request.query_params.get("max_level", 1)),
             "level": self.request.query_params.get("level", None),
-            "many": True if self.action in ["list", "size"] else False,
+            "fields": parse_fields(self.request.query_params.get("fields", None)),
+            "group": self.request.query_params.get("group", None),
+            "aggregate": self.request.query_params.get("aggregate", None),
+            "export_format": self.request.query_params.get("export_format", "ndjson"),
+            "import_format": self.request.query_params.get("import_format", "ndjson"),
+            "upsert": True if "upsert" in self.request.query_params.keys() else False,
+            "many": True if self.action in ["list", "size", "aggregate", "export"] else False,
         }
+        if self.action == "aggregate":
+            params["aggregate_order"], params["order"] = params["order"], None
         return params
 
     def get_queryset(self) -> QuerySet:
@@ -42,11 +179,21 @@ class SnatchGenericViewSet(GenericViewSet):
              Queryset для десериализации
         """
         queryset = GenericViewSet.get_queryset(self)
+        db = self.get_db()
+        if db is not None:
+            queryset = queryset.using(db)
         model = queryset.model
         params = self.get_params()
         filter_ = self._get_filter(params, model)
-
-        # TODO в зависимости от уровня вложенности указывать select_related
+        self._check_cost(params, queryset, filter_)
+        if self.action in ["list", "retrieve"]:
+            self._check_fields(params, model)
+            queryset = self.query_planner_class()(
+                queryset,
+                self.get_serializer_class(),
+                params["max_level"],
+                params["fields"],
+            )
 
         return self._init_router(params["many"])(queryset, params, filter_)
 
@@ -57,12 +204,459 @@ class SnatchGenericViewSet(GenericViewSet):
             контекст для сериализатора
         """
         params = self.get_params()
-        data = {key: params[key] for key in ["max_level", "level"] if key in params}
+        data = {
+            key: params[key] for key in ["max_level", "level", "fields"] if key in params
+        }
         data.update(
             {"request": self.request, "format": self.format_kwarg, "view": self}
         )
         return data
 
+    def get_list_data(self, queryset) -> t.Tuple[t.List, t.Optional[int], t.Optional[str]]:
+        """Сериализация списка записей и получение их общего количества (параметр with_count)
+
+        Количество берется из оконной функции COUNT(*) OVER() той же строки запроса. Если страница пуста,
+        выполняется отдельный подсчет в режиме capped; если оконная функция не применялась (distinct или
+        не первая страница по курсору) - подсчет в режиме count_mode.
+
+        Args:
+            queryset: множество записей или список записей страницы
+
+        Returns:
+            сериализованные записи, количество записей (None без with_count), режим подсчета
+        """
+        values_serializer = self.get_values_serializer(queryset)
+        if not self.get_params()["with_count"]:
+            if values_serializer is not None:
+                return values_serializer(queryset), None, None
+            return self.get_serializer(queryset, many=True).data, None, None
+
+        count = None
+        if values_serializer is not None:
+            extra = (self.count_annotation,) if self.window_count else tuple()
+            rows = list(values_serializer.get_rows(queryset, *extra))
+            if rows and self.window_count:
+                count = rows[0][-1]
+            data = values_serializer.serialize_rows(rows)
+        else:
+            rows = list(queryset)
+            if rows and self.window_count:
+                count = getattr(rows[0], self.count_annotation)
+            data = self.get_serializer(rows, many=True).data
+        if count is not None:
+            return data, count, "window"
+        count_mode = "capped" if self.window_count else self.get_params()["count_mode"]
+        count, count_mode = self.get_counter()(self.count_queryset, count_mode)
+        return data, count, count_mode
+
+    def get_db(self) -> t.Optional[str]:
+        """Получение алиаса БД для текущего запроса
+
+        Действия на чтение выполняются на реплике из read_replicas (если клиент не закреплен за основной БД
+        после изменения записей), остальные - в БД по роутеру Django. Выбор выполняется один раз на запрос.
+
+        Returns:
+            алиас БД или None, если используется БД по-умолчанию
+        """
+        if not hasattr(self, "_db"):
+            self._db = None
+            if self.read_replicas and self.action in self.read_actions:
+                primary = router.db_for_write(self.queryset.model)
+                self._db = self.get_replica_selector()(primary, self.get_replica_client())
+        return self._db
+
+    def get_replica_selector(self) -> ReplicaSelector:
+        """Получение объекта выбора реплики
+
+        Returns:
+            объект выбора реплики
+        """
+        return self.replica_selector_class(
+            self.read_replicas,
+            strategy=self.replica_strategy,
+            max_lag=self.replica_max_lag,
+            sticky=self.replica_sticky,
+        )
+
+    def get_replica_client(self) -> t.Optional[str]:
+        """Получение идентификатора клиента для закрепления за основной БД
+
+        Returns:
+            идентификатор пользователя или IP адрес клиента
+        """
+        user = getattr(self.request, "user", None)
+        if user is not None and user.is_authenticated:
+            return f"user:{user.pk}"
+        address = self.request.META.get("REMOTE_ADDR")
+        return f"addr:{address}" if address else None
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if (
+            self.read_replicas
+            and self.replica_sticky
+            and request.method not in SAFE_METHODS
+            and response.status_code < status.HTTP_400_BAD_REQUEST
+        ):
+            self.get_replica_selector().pin(self.get_replica_client())
+        return super().finalize_response(request, response, *args, **kwargs)
+
+    def get_query_timeout(self):
+        """Получение контекста ограничения времени выполнения запросов к БД для текущего действия
+
+        statement_timeout и time_budget задаются числом (мс) или словарем {действие: мс}, в котором ключ default
+        задает значение для остальных действий.
+
+        Returns:
+            контекстный менеджер
+        """
+        values = list()
+        for value in (self.statement_timeout, self.time_budget):
+            if isinstance(value, dict):
+                value = value.get(self.action, value.get("default", 0))
+            values.append(value or 0)
+        return self.query_timeout_class(*values)(self.queryset.model, self.get_db())
+
+    def iter_with_query_timeout(self, chunks: t.Iterator[bytes]) -> t.Iterator[bytes]:
+        """Получение фрагментов потокового ответа с ограничением времени выполнения запросов к БД.
+        Генератор потока выполняется после выхода из обработчика действия, поэтому ограничение действует
+        на время его работы; при превышении ограничения передача ответа прерывается.
+
+        Args:
+            chunks: итератор фрагментов ответа
+
+        Returns:
+            итератор фрагментов ответа
+        """
+        with self.get_query_timeout():
+            yield from chunks
+
+    def get_validators(self, data) -> t.Dict[str, str]:
+        """Получение валидаторов ответа (ETag и Last-Modified) для условных запросов
+
+        ETag вычисляется по запросу и версиям таблиц, данные которых попадают в ответ. Если указан
+        last_modified_field, дополнительно учитываются максимальное значение этого поля и количество записей
+        (для списка - одним агрегирующим запросом), а его значение возвращается в Last-Modified.
+
+        Args:
+            data: множество записей, список записей или запись
+
+        Returns:
+            словарь заголовков ответа
+        """
+        if not self.conditional_requests:
+            return dict()
+        parts = [
+            self.request.get_full_path(),
+            str(getattr(self.request, "accepted_media_type", "")),
+            str(getattr(self.request.user, "pk", None)),
+            *table_versions.get_many(self.get_dependencies()),
+        ]
+        headers = dict()
+        if self.last_modified_field:
+            last_modified, count = self._get_last_modified(data)
+            parts.extend([str(last_modified), str(count)])
+            if last_modified is not None:
+                headers["Last-Modified"] = http_date(last_modified.timestamp())
+        etag = hashlib.sha1(":".join(parts).encode()).hexdigest()
+        headers["ETag"] = f'W/"{etag}"'
+        return headers
+
+    def get_dependencies(self) -> t.Tuple[type(Model), ...]:
+        """Получение моделей, от данных которых зависит ответ: таблиц графа сериализатора с учетом max_level
+        (для /size и /aggregate - только модели представления) и таблиц отношений из параметров фильтрации,
+        сортировки и группировки
+
+        Returns:
+            кортеж моделей
+        """
+        params = self.get_params()
+        model = GenericViewSet.get_queryset(self).model
+        if self.action in ["size", "aggregate"]:
+            models = (model,)
+        else:
+            models = table_versions.get_dependencies(
+                self.get_serializer_class(), params["max_level"]
+            )
+        order_ = self._get_order(params, model)
+        if self.action == "aggregate":
+            order_ = self.get_aggregation().lookups
+        query_models = table_versions.get_query_models(
+            model, self._get_filter(params, model), order_
+        )
+        return models + tuple(item for item in query_models if item not in models)
+
+    def get_cache_scope(self) -> str:
+        """Получение области прав пользователя для ключа кэша ответов.
+        Может быть переопределен, например, для общего кэша пользователей одной группы.
+
+        Returns:
+            область прав пользователя
+        """
+        user = getattr(self.request, "user", None)
+        if user is None or not user.is_authenticated:
+            return "anonymous"
+        return f"user:{user.pk}"
+
+    def get_response_cache_key(self) -> t.Optional[str]:
+        """Получение ключа кэша ответа
+
+        Returns:
+            ключ кэша или None, если кэш ответов отключен
+        """
+        if not self.response_cache:
+            return None
+        params = sorted(
+            (key, value)
+            for key, values in self.request.query_params.lists()
+            for value in values
+        )
+        return self.get_response_cache().make_key(
+            GenericViewSet.get_queryset(self).model,
+            self.action,
+            params,
+            self.get_cache_scope(),
+            self.get_dependencies(),
+        )
+
+    def get_response_cache(self) -> ResponseCache:
+        """Получение кэша ответов
+
+        Returns:
+            кэш ответов
+        """
+        return self.response_cache_class(
+            self.response_cache_alias, self.response_cache_timeout
+        )
+
+    def get_cached_response(self, cache_key: t.Optional[str]) -> t.Optional[HttpResponse]:
+        """Получение ответа из кэша (с учетом условного запроса)
+
+        Args:
+            cache_key: ключ кэша
+
+        Returns:
+            ответ или None, если его нет в кэше
+        """
+        if cache_key is None:
+            return None
+        cached = self.get_response_cache().get(cache_key)
+        if cached is None:
+            return None
+        data, headers = cached
+        not_modified = self.get_not_modified_response(headers)
+        if not_modified is not None:
+            return not_modified
+        return Response(data, status=status.HTTP_200_OK, headers=headers)
+
+    def set_cached_response(
+        self, cache_key: t.Optional[str], data: t.Any, headers: t.Dict[str, str]
+    ):
+        """Сохранение ответа в кэш
+
+        Args:
+            cache_key: ключ кэша
+            data: данные ответа
+            headers: заголовки ответа
+
+        Returns:
+
+        """
+        if cache_key is not None:
+            self.get_response_cache().set(cache_key, data, headers)
+
+    def get_not_modified_response(self, headers: t.Dict[str, str]) -> t.Optional[HttpResponse]:
+        """Получение ответа 304 (или 412) на условный запрос без сериализации данных
+
+        Args:
+            headers: валидаторы ответа
+
+        Returns:
+            ответ или None, если данные необходимо вернуть
+        """
+        if not headers:
+            return None
+        last_modified = headers.get("Last-Modified")
+        response = get_conditional_response(
+            self.request,
+            etag=headers.get("ETag"),
+            last_modified=parse_http_date_safe(last_modified) if last_modified else None,
+        )
+        if response is not None:
+            for key, value in headers.items():
+                response[key] = value
+        return response
+
+    def _get_last_modified(self, data) -> t.Tuple[t.Any, int]:
+        """Получение максимального значения last_modified_field и количества записей
+
+        Args:
+            data: множество записей, список записей или запись
+
+        Returns:
+            максимальное значение поля, количество записей
+        """
+        if isinstance(data, QuerySet):
+            result = data.aggregate(
+                last_modified=Max(self.last_modified_field), count=Count("pk")
+            )
+            return result["last_modified"], result["count"]
+        rows = data if isinstance(data, list) else [data]
+        values = [getattr(row, self.last_modified_field) for row in rows]
+        values = [value for value in values if value is not None]
+        return (max(values) if values else None), len(rows)
+
+    def get_values_serializer(self, queryset) -> t.Optional[ValuesSerializer]:
+        """Получение быстрого сериализатора списка через values_list()
+
+        Args:
+            queryset: множество записей для сериализации
+
+        Returns:
+            быстрый сериализатор или None, если для данного запроса он недоступен
+        """
+        if not self.values_serialization or not isinstance(queryset, QuerySet):
+            return None
+        params = self.get_params()
+        values_serializer = self.values_serializer_class(
+            self.get_serializer_class(), params["max_level"], params["fields"]
+        )
+        return values_serializer if values_serializer.is_available else None
+
+    def get_mass_operation(self) -> MassOperation:
+        """Получение массовой операции над записями, удовлетворяющими параметрам фильтрации
+
+        Returns:
+            массовая операция
+        """
+        queryset = GenericViewSet.get_queryset(self)
+        model = queryset.model
+        params = self.get_params()
+        filter_ = self._get_filter(params, model)
+        if not filter_:
+            raise GetObjectException(model._meta.object_name, "no_filter")
+        self._check_cost(params, queryset, filter_)
+        return self.mass_operation_class(
+            queryset.filter(filter_),
+            max_rows=self.mass_max_rows,
+            send_signals=self.mass_send_signals,
+        )
+
+    def get_exporter(self) -> Exporter:
+        """Получение объекта выгрузки записей в формате export_format
+
+        Returns:
+            объект выгрузки
+        """
+        return self.exporter_class(self.get_params()["export_format"], self.stream_chunk_size)
+
+    def get_export_columns(self, model: type(Model)) -> t.List[t.Tuple[str, str]]:
+        """Получение колонок выгрузки по параметру fields
+
+        Args:
+            model: модель
+
+        Returns:
+            список (имя колонки, путь в нотации Django)
+        """
+        try:
+            return self.get_exporter().get_columns(model, self.request.query_params.get("fields", None))
+        except FilterException as ex:
+            raise ModelFilterException(model._meta.object_name, ex)
+
+    def get_importer(self) -> Importer:
+        """Получение объекта загрузки записей в формате import_format
+
+        Returns:
+            объект загрузки
+        """
+        params = self.get_params()
+        return self.importer_class(
+            self.queryset.model,
+            params["import_format"],
+            upsert=params["upsert"],
+            chunk_size=self.bulk_batch_size,
+            max_rejects=self.import_max_rejects,
+        )
+
+    def get_aggregation(self) -> Aggregation:
+        """Получение агрегации по параметрам group, aggregate и order
+
+        Returns:
+            агрегация
+        """
+        params = self.get_params()
+        model = self.queryset.model
+        try:
+            return self.aggregation_class(
+                model, params["group"], params["aggregate"], params.get("aggregate_order")
+            )
+        except FilterException as ex:
+            raise ModelFilterException(model._meta.object_name, ex)
+
+    def get_bulk_writer(self) -> BulkWriter:
+        """Получение объекта для пакетной записи списка объектов
+
+        Returns:
+            объект пакетной записи
+        """
+        return self.bulk_writer_class(
+            self.get_serializer_class(),
+            self.get_serializer_context(),
+            batch_size=self.bulk_batch_size,
+        )
+
+    def get_bulk_data(self, objects: t.List[Model]) -> t.List:
+        """Получение ответа пакетной операции
+
+        Args:
+            objects: список записанных объектов
+
+        Returns:
+            список первичных ключей (параметр pk_only) или сериализованных объектов
+        """
+        if self.get_params()["pk_only"]:
+            return [instance.pk for instance in objects]
+        return self.get_serializer(objects, many=True).data
+
+    def is_stream(self, queryset) -> bool:
+        """Проверка необходимости потокового вывода списка
+
+        Потоковый вывод используется при указании параметра stream или если limit не меньше
+        stream_threshold (0 - только по параметру) и не указан параметр with_count.
+
+        Args:
+            queryset: множество записей для сериализации
+
+        Returns:
+            True, если список выводится потоком
+        """
+        if not isinstance(queryset, QuerySet):
+            return False
+        params = self.get_params()
+        if params["with_count"]:
+            return False
+        return params["stream"] or 0 < self.stream_threshold <= params["limit"]
+
+    def get_stream(self, queryset: QuerySet) -> t.Iterator[bytes]:
+        """Получение потока фрагментов JSON для списка записей
+
+        Args:
+            queryset: множество записей для сериализации
+
+        Returns:
+            итератор фрагментов ответа
+        """
+        stream = self.stream_class(self.stream_chunk_size)
+        values_serializer = self.get_values_serializer(queryset)
+        if values_serializer is not None:
+            chunks = values_serializer.iter_chunks(queryset, self.stream_chunk_size)
+        else:
+            chunks = (
+                self.get_serializer(chunk, many=True).data
+                for chunk in stream.iter_objects(queryset)
+            )
+        return stream(chunks)
+
     def _get_filter(self, params: t.Dict, model: Model) -> Q:
         """Получение параметров фильтрации для соответствующей модели в нотации Django
 
@@ -80,6 +674,47 @@ class SnatchGenericViewSet(GenericViewSet):
         except FilterException as ex:
             raise ModelFilterException(model._meta.object_name, ex)
 
+    def get_counter(self) -> QueryCounter:
+        """Получение объекта для подсчета количества записей
+
+        Returns:
+            объект подсчета количества записей
+        """
+        return self.counter_class(cap=self.count_cap, ttl=self.count_cache_ttl)
+
+    def _check_cost(self, params: t.Dict, queryset: QuerySet, filter_: Q):
+        """Проверка стоимости запроса до его выполнения в БД
+
+        Args:
+            params: параметры запроса
+            queryset: исходное множество записей
+            filter_: преобразованные параметры фильтрации
+
+        Returns:
+
+        """
+        try:
+            self.cost_guard_class(self.query_cost)(params, queryset, filter_)
+        except FilterException as ex:
+            raise ModelFilterException(queryset.model._meta.object_name, ex)
+
+    def _check_fields(self, params: t.Dict, model: Model):
+        """Проверка путей параметра fields по полям сериализатора
+
+        Args:
+            params: параметры запроса
+            model: модель
+
+        Returns:
+
+        """
+        if not params["fields"]:
+            return
+        try:
+            self.query_planner_class().validate_fields(self.get_serializer_class()(), params["fields"])
+        except FilterException as ex:
+            raise ModelFilterException(model._meta.object_name, ex)
+
     def _get_order(self, params: t.Dict, model: Model) -> t.List[str]:
         """Получение параметров сортировки для соответствующей модели в нотации Django
 
@@ -125,12 +760,15 @@ class SnatchGenericViewSet(GenericViewSet):
             raise GetObjectException(model_name, "no_filter")
 
         error_name = None
-        if "distinct" in params.keys():
+        if params.get("distinct"):
             queryset = queryset.filter(filter_).distinct()
-            if queryset.count() == 0:
+            rows = list(queryset[:2])
+            if not rows:
                 error_name = "not_found"
-            elif queryset.count() > 1:
+            elif len(rows) > 1:
                 error_name = "many_found"
+            else:
+                queryset = rows[0]
         else:
             try:
                 queryset = queryset.get(filter_)
@@ -163,16 +801,68 @@ class SnatchGenericViewSet(GenericViewSet):
                 queryset = queryset.filter(filter_)
             if params.get("distinct"):
                 queryset = queryset.distinct()
+            if self.action == "aggregate":
+                return queryset
+            if params.get("with_count") and self.action == "list":
+                queryset = self._init_window_count(queryset, params)
+            if params.get("cursor") is not None and self.action == "list":
+                return self._init_cursor(queryset, params, order_)
             if order_:
                 queryset = queryset.order_by(*order_)
+            if self.action == "export":
+                return queryset
             if "limit" in params or "offset" in params:
                 queryset = queryset[
                     params.get("offset") : params.get("limit") + params.get("offset")
                 ]
+        except FilterException as ex:
+            raise ModelFilterException(model_name, ex)
+        except QueryTimeoutException:
+            raise
         except Exception as ex:
             raise GetObjectException(model_name, ex=ex)
         return queryset
 
+    def _init_window_count(self, queryset: QuerySet, params: t.Dict) -> QuerySet:
+        """Добавление оконной функции COUNT(*) OVER() для получения количества записей вместе со страницей
+
+        Оконная функция не применяется для distinct (считает строки до удаления дублей) и для страниц
+        по непустому курсору (считает только строки после курсора).
+
+        Args:
+            queryset: отфильтрованное множество записей
+            params: параметры запроса
+
+        Returns:
+            множество записей, количество сохраняется в count_queryset и window_count
+        """
+        self.count_queryset = queryset
+        self.window_count = not params.get("distinct") and not params.get("cursor")
+        if not self.window_count:
+            return queryset
+        return queryset.annotate(**{self.count_annotation: Window(Count("*"))})
+
+    def _init_cursor(
+        self, queryset: QuerySet, params: t.Dict, order_: t.List[str]
+    ) -> t.List[Model]:
+        """Метод получения страницы записей по курсору (keyset пагинация)
+
+        Args:
+            queryset: отфильтрованное множество записей
+            params: параметры запроса
+            order_: список полей модели для сортировки
+
+        Returns:
+            список записей страницы, курсор следующей страницы сохраняется в next_cursor
+        """
+        pagination = self.keyset_pagination_class(
+            queryset.model, order_, params.get("order")
+        )
+        rows, self.next_cursor = pagination(
+            queryset, params["cursor"], params["limit"]
+        )
+        return rows
+
 
 class SnatchReadOnlyModelViewSet(
     mixins.SnatchInfoModelMixin,
@@ -39,7 +39,7 @@ def add_link_many(func):
         if not self.parent:
             return result
 
-        link = get_link_many(data.field, data.instance)
+        link = get_link_many(data.field, data.instance, self)
 
         if result and old_max_level > 0:
             return {"link": link, "self": result if result else None}
@@ -99,3 +99,25 @@ def add_link_one(func):
         }
 
     return wrapper
+
+
+def load_relation(relation: str):
+    """Декоратор метода SnatchSerializerMethodField для указания загружаемого методом отношения модели.
+    Метод получает менеджер отношения, а дочерние объекты всех родительских объектов списка загружаются
+    одним запросом на уровень вложенности.
+
+    Пример:
+    ----------------------
+    @load_relation("action_list")
+    def get_actions(self, value):
+        context = copy.copy(self.context)
+        context["is_child"] = True
+        return ActionSerializer(value, many=True, context=context).data
+    ----------------------
+
+    """
+    def decorator(func):
+        func.snatch_relation = relation
+        return func
+
+    return decorator